@@ -6,12 +6,18 @@ Allows easy creation of windows and menus. Code for each window runs concurrentl
 
 '''
 from cursed.app import CursedApp
-from cursed.window import CursedWindow
+from cursed.window import CursedWindow, background
 from cursed.menu import CursedMenu
+from cursed.viewer import CursedViewer
+from cursed.tail import CursedTail
+from cursed.layout import CursedLayout, CursedHSplit, CursedVSplit, CursedPane
+from cursed.style import CursedStyle, define_style
 
 __author__ = 'Johan Nestaas <johannestaas@gmail.com>'
 __title__ = 'cursed'
 __version__ = '0.2.1'
 __license__ = 'GPLv3'
 __copyright__ = 'Copyright 2016 Johan Nestaas'
-__all__ = ['CursedApp', 'CursedWindow', 'CursedMenu']
+__all__ = ['CursedApp', 'CursedWindow', 'CursedMenu', 'CursedViewer',
+           'CursedTail', 'CursedLayout', 'CursedHSplit', 'CursedVSplit',
+           'CursedPane', 'CursedStyle', 'background', 'define_style']
@@ -148,12 +148,18 @@ arrow keys.
 '''
 
 import sys
+import time
 import traceback
 import gevent
 import six
 import curses
+from gevent.event import Event
 
 from cursed.window import CursedWindowClass
+from cursed.backend import CursesBackend
+from cursed.style import _start_colors
+from cursed.mouse import _HitIndex
+from cursed.exceptions import CursedWindowError
 
 
 class Result(object):
@@ -237,44 +243,283 @@ class CursedApp(object):
         result.unwrap()
     '''
 
-    def __init__(self):
+    def __init__(self, poll_input=False, input_timeout=0.1, max_fps=60,
+                 backend=None, mouse=False):
         '''
         Initializes the CursedApp. No parameters are required.
+
+        By default the input loop sleeps until the terminal has input ready,
+        instead of busy-polling ``getch``, so an idle application uses close
+        to no CPU.
+
+        :param poll_input: poll ``getch`` on every pass of the input loop
+            rather than waiting for stdin to be readable
+        :param input_timeout: max seconds to wait for input before checking
+            whether the windows have exited, default 0.1
+        :param max_fps: max frames per second written to the terminal, or
+            None to write a frame as soon as any window is refreshed
+        :param backend: the screen backend, default a
+            ``cursed.backend.CursesBackend`` drawing to the terminal. Pass a
+            ``cursed.backend.MemoryBackend`` to run without a terminal.
+        :param mouse: enable the mouse, sending clicks, wheel scrolls and
+            motion to the window under the pointer, see
+            ``CursedWindow.getmouse``
+
+        ``app.stats`` counts the frames written, the window refreshes that
+        went into them, the refreshes skipped because the window hadn't
+        changed, and the calls to the windows' ``update``.
+
+        Keys are sent to the focused window, set with ``app.focus(Window)``,
+        and to every window which declares ``WANTS_KEYS = True``. If no window
+        has focus and none declare WANTS_KEYS, every window gets every key.
+
+        Windows can be placed by splitting the screen instead of by X and Y,
+        see ``set_layout``.
         '''
         self.scr = None
         self.menu = None
         self.threads = []
         self.windows = None
         self.running = True
+        self.poll_input = poll_input
+        self.input_timeout = input_timeout
+        self.max_fps = max_fps
+        self.backend = backend if backend is not None else CursesBackend()
+        self.mouse = mouse
+        self._hit_index = None
+        self.stats = {'frames': 0, 'refreshes': 0, 'skipped_refreshes': 0,
+                      'updates': 0}
+        self._frame_ready = Event()
+        self._render_thread = None
+        self.focused = None
+        self._key_windows = []
+        self._repaint = False
+        self.layout = None
+
+    def set_layout(self, layout):
+        '''
+        Places windows declared with WIDTH and HEIGHT 'layout' by splitting the
+        screen, see ``cursed.layout``. It can be called before ``run``, or
+        while running to switch to another layout.
+
+        :param layout: a CursedHSplit, CursedVSplit or CursedPane
+        '''
+        self.layout = layout
+        if self.windows is not None:
+            self.relayout()
+
+    def relayout(self):
+        '''
+        Applies changes to the layout, after a node was changed with
+        ``CursedLayout.set``. Only the windows that moved or changed size are
+        recreated and redrawn.
+        '''
+        old = dict((cw, (cw.X, cw.Y, cw.WIDTH, cw.HEIGHT))
+                   for cw in self.windows)
+        self._fix_windows()
+        changed = [cw for cw in self.windows
+                   if old[cw] != (cw.X, cw.Y, cw.WIDTH, cw.HEIGHT)]
+        # Windows can move into each other's old regions, so blank them first
+        for cw in changed:
+            if not cw.PAD or cw.VIRTUAL_PAD:
+                self._clear_region(*old[cw])
+        for cw in changed:
+            cw._cw_relayout(self.window)
+        self._hit_index = _HitIndex(self.windows, self.MAX_WIDTH,
+                                    self.MAX_HEIGHT)
+        self._repaint = True
+        self._request_frame()
+
+    def _fix_windows(self):
+        '''
+        Works out the geometry of every window for the current screen size.
+        '''
+        width, height = self.MAX_WIDTH, self.MAX_HEIGHT
+        CursedWindowClass._fix_windows(width, height)
+        if self.layout is not None:
+            self.layout._apply(0, 0, width, height)
+        placed = self.layout.windows() if self.layout is not None else []
+        for cw in CursedWindowClass.WINDOWS:
+            if 'layout' in cw._CW_SIZE and cw not in placed:
+                raise CursedWindowError('{name} is sized by layout but not in '
+                                        'the app layout'
+                                        .format(name=cw.__name__))
+            # Windows that don't fit anymore are cut off, or hidden entirely
+            cw.WIDTH = min(cw.WIDTH, width - cw.X)
+            cw.HEIGHT = min(cw.HEIGHT, height - cw.Y)
 
     def _run_windows(self):
-        CursedWindowClass._fix_windows(self.MAX_WIDTH, self.MAX_HEIGHT)
+        self._fix_windows()
         self.windows = CursedWindowClass.WINDOWS
         self.active_window = None
+        self._route_keys()
+        self._hit_index = _HitIndex(self.windows, self.MAX_WIDTH,
+                                    self.MAX_HEIGHT)
         for i, cw in enumerate(self.windows):
             thread = gevent.spawn(cw._cw_run, self, self.window)
             cw.THREAD = thread
             self.threads += [thread]
 
+    def _windows_running(self):
+        if any(cw.THREAD.exception is not None for cw in self.windows):
+            self._stop_windows()
+            return False
+        return any(cw.RUNNING and cw.WAIT for cw in self.windows)
+
+    def _stop_windows(self):
+        '''
+        Stops every window, waking the ones asleep until their next update or
+        waiting for a key so they see it.
+        '''
+        for cw in self.windows:
+            cw.RUNNING = False
+            cw._cw_wake()
+
+    def _read_keys(self):
+        while True:
+            c = self.window.getch()
+            if c == -1:
+                return
+            if c == curses.KEY_MOUSE and self.mouse:
+                self._read_mouse()
+                continue
+            if c == curses.KEY_RESIZE:
+                self._resize()
+                continue
+            for cw in self._key_windows:
+                cw._cw_put_key(c)
+
+    def _resize(self):
+        '''
+        Lays the windows out again for the new terminal size, recreating only
+        the windows whose geometry changed, then repaints the whole screen in
+        one frame.
+        '''
+        height, width = self.scr.getmaxyx()
+        if (width, height) == (self.MAX_WIDTH, self.MAX_HEIGHT):
+            return
+        self.MAX_WIDTH, self.MAX_HEIGHT = width, height
+        try:
+            self.window.resize(height, width)
+        except curses.error:
+            pass
+        # The terminal's contents are unknown after a resize, so redraw it all
+        self.window.clearok(1)
+        self.relayout()
+
+    def _clear_region(self, x, y, width, height):
+        '''
+        Blanks where a window used to be, since subwindows share the root
+        window's memory.
+        '''
+        width = min(width, self.MAX_WIDTH - x)
+        for row in range(y, min(y + height, self.MAX_HEIGHT)):
+            if width > 0:
+                self.window.hline(row, x, ' ', width)
+
+    def _read_mouse(self):
+        try:
+            _, x, y, _, bstate = self.backend.getmouse()
+        except curses.error:
+            return
+        cw, event = self._hit_index.find(x, y, bstate)
+        if cw is None:
+            return
+        # Clicking focuses a window, if the app is using focus at all
+        if event.clicked() and self.focused not in (None, cw):
+            self.focus(cw)
+        cw._cw_put_mouse(event)
+
+    def _route_keys(self):
+        '''
+        Works out which windows keys are sent to, whenever the focus changes.
+        '''
+        if self.windows is None:
+            return
+        windows = [cw for cw in self.windows
+                   if cw.WANTS_KEYS or cw is self.focused]
+        if self.focused is None and not windows:
+            windows = list(self.windows)
+        self._key_windows = windows
+
+    def focus(self, window):
+        '''
+        Gives a window the keyboard focus, so it receives the keys typed.
+
+        :param window: the CursedWindow class to focus, or None to unfocus
+        '''
+        self.focused = window
+        self._route_keys()
+
+    def focus_next(self):
+        '''
+        Moves the focus to the next running window, in the order they were
+        declared.
+        '''
+        running = [cw for cw in self.windows if cw.RUNNING]
+        if not running:
+            return
+        if self.focused not in running:
+            return self.focus(running[0])
+        i = running.index(self.focused) + 1
+        self.focus(running[i % len(running)])
+
+    def _wait_input(self):
+        if self.poll_input:
+            gevent.sleep(0)
+            return
+        self.backend.wait_input(self.input_timeout)
+
+    def _request_frame(self):
+        self._frame_ready.set()
+
+    def _render_frame(self):
+        '''
+        Copies every refreshed window to the virtual screen, then writes them
+        all to the terminal at once.
+        '''
+        refreshed = [cw for cw in self.windows
+                     if cw._CW_REFRESH and not cw._CW_HIDDEN]
+        if self._repaint:
+            # After a relayout, paint the whole screen at once
+            self._repaint = False
+            self.window.noutrefresh()
+            refreshed = [cw for cw in self.windows if not cw._CW_HIDDEN]
+        if not refreshed:
+            return
+        for cw in refreshed:
+            cw._cw_noutrefresh()
+        self.backend.doupdate()
+        self.stats['frames'] += 1
+        self.stats['refreshes'] += len(refreshed)
+
+    def _render_loop(self):
+        while self.running:
+            self._frame_ready.wait()
+            self._frame_ready.clear()
+            start = time.time()
+            self._render_frame()
+            if self.max_fps:
+                gevent.sleep(max(1.0 / self.max_fps - (time.time() - start),
+                                 0))
+        # Flush whatever the windows drew right before exiting
+        self._render_frame()
+
     def _input_loop(self):
         while self.running:
-            for cw in self.windows:
-                if cw.THREAD.exception is not None:
-                    for cw in self.windows:
-                        cw.RUNNING = False
-                    self.running = False
-                    break
-                if cw.RUNNING and cw.WAIT:
-                    break
-            else:
+            if self._render_thread.exception is not None:
+                self._stop_windows()
                 self.running = False
                 break
-            gevent.sleep(0)
-            c = self.window.getch()
-            if c == -1:
-                continue
-            for cw in self.windows:
-                cw.KEY_EVENTS.put(c)
+            if not self._windows_running():
+                self.running = False
+                break
+            # Drain everything curses has buffered, then sleep in the gevent
+            # hub until the tty is readable again.
+            self._read_keys()
+            self._wait_input()
+        # Wake up the render loop so it can exit
+        self._request_frame()
 
     def run(self):
         '''
@@ -284,16 +529,18 @@ class CursedApp(object):
         '''
         result = Result()
         try:
-            self.scr = curses.initscr()
+            self.scr = self.backend.start()
+            _start_colors(self.backend)
             self.MAX_HEIGHT, self.MAX_WIDTH = self.scr.getmaxyx()
-            curses.noecho()
-            curses.cbreak()
-            curses.start_color()
-            curses.use_default_colors()
             self.window = self.scr.subwin(0, 0)
             self.window.keypad(1)
             self.window.nodelay(1)
+            if self.mouse:
+                self.backend.mousemask(curses.ALL_MOUSE_EVENTS |
+                                       curses.REPORT_MOUSE_POSITION)
             self._run_windows()
+            self._render_thread = gevent.spawn(self._render_loop)
+            self.threads += [self._render_thread]
             self.threads += [gevent.spawn(self._input_loop)]
             gevent.joinall(self.threads)
             for thread in self.threads:
@@ -305,8 +552,6 @@ class CursedApp(object):
             result._extract_exception()
         finally:
             if self.scr is not None:
-                self.scr.keypad(0)
-                curses.echo()
-                curses.nocbreak()
-                curses.endwin()
+                _start_colors(None)
+                self.backend.stop()
         return result
@@ -0,0 +1,655 @@
+#!/usr/bin/env python
+'''
+cursed.backend
+
+The screen backends used by the CursedApp. The default CursesBackend talks to
+the terminal through curses, and the MemoryBackend keeps the whole screen in
+memory so applications can run without a terminal, like in CI or in
+benchmarks.
+
+Example:
+::
+
+    from cursed import CursedApp
+    from cursed.backend import MemoryBackend
+
+    backend = MemoryBackend(width=80, height=24, keys=['a', 'b', 27])
+    app = CursedApp(backend=backend)
+
+    ...
+
+    result = app.run()
+    print('\\n'.join(backend.screen_text()))
+'''
+
+import sys
+import socket
+import curses
+import six
+from collections import deque
+from gevent.event import Event
+from gevent.socket import wait_read
+from cursed.width import char_width
+
+
+class CursesBackend(object):
+    '''
+    The default backend, which draws to the terminal with curses.
+    '''
+
+    def __init__(self):
+        self.scr = None
+        self.fd = None
+        self.color_pairs = 0
+
+    def start(self):
+        '''
+        Initializes the terminal and returns the root curses window.
+        '''
+        self.fd = sys.stdin.fileno()
+        self.scr = curses.initscr()
+        curses.noecho()
+        curses.cbreak()
+        curses.start_color()
+        curses.use_default_colors()
+        if curses.has_colors():
+            self.color_pairs = curses.COLOR_PAIRS
+        return self.scr
+
+    def stop(self):
+        '''
+        Restores the terminal to how it was before ``start``.
+        '''
+        if self.scr is None:
+            return
+        self.scr.keypad(0)
+        curses.echo()
+        curses.nocbreak()
+        curses.endwin()
+
+    def newpad(self, nlines, ncols):
+        return curses.newpad(nlines, ncols)
+
+    def doupdate(self):
+        curses.doupdate()
+
+    def init_pair(self, pair, fg, bg):
+        curses.init_pair(pair, fg, bg)
+
+    def color_pair(self, pair):
+        return curses.color_pair(pair)
+
+    def echo(self):
+        curses.echo()
+
+    def noecho(self):
+        curses.noecho()
+
+    def mousemask(self, mask):
+        return curses.mousemask(mask)
+
+    def getmouse(self):
+        return curses.getmouse()
+
+    def wait_input(self, timeout=None):
+        '''
+        Sleeps the calling greenlet until stdin is readable or timeout seconds
+        have passed.
+        '''
+        try:
+            wait_read(self.fd, timeout=timeout)
+        except socket.timeout:
+            pass
+
+
+class MemoryBackend(object):
+    '''
+    A backend that needs no terminal. The screen is a grid of cells in memory,
+    each holding a character and its attributes, and keys come from a script
+    instead of the keyboard.
+
+    :param width: the width of the screen, default 80
+    :param height: the height of the screen, default 24
+    :param keys: optional iterable of keys to feed the application, either
+        integer keycodes or strings, where each character is one keypress
+    :param color_pairs: the number of color pairs, like curses.COLOR_PAIRS,
+        default 256
+    '''
+
+    def __init__(self, width=80, height=24, keys=None, color_pairs=256):
+        self.width = width
+        self.height = height
+        self.color_pairs = color_pairs
+        self.pairs = {}
+        self.scr = None
+        self.echoing = False
+        self.updates = 0
+        self.cells_written = 0
+        self._keys = deque()
+        self._mouse = deque()
+        self._mousemask = 0
+        self._key_ready = Event()
+        self._virtual = _Cells(height, width)
+        self._screen = _Cells(height, width)
+        if keys:
+            self.push_keys(keys)
+
+    def start(self):
+        self.scr = MemoryWindow(self, _Cells(self.height, self.width),
+                                self.height, self.width)
+        return self.scr
+
+    def stop(self):
+        pass
+
+    def newpad(self, nlines, ncols):
+        return MemoryWindow(self, _Cells(nlines, ncols), nlines, ncols,
+                            pad=True)
+
+    def doupdate(self):
+        '''
+        Copies the virtual screen onto the screen, counting the cells that
+        changed in ``cells_written``.
+        '''
+        self.updates += 1
+        screen, virtual = self._screen, self._virtual
+        for y in range(self.height):
+            if screen.chars[y] != virtual.chars[y]:
+                self.cells_written += sum(
+                    1 for a, b in zip(screen.chars[y], virtual.chars[y])
+                    if a != b
+                )
+                screen.chars[y] = virtual.chars[y][:]
+            if screen.attrs[y] != virtual.attrs[y]:
+                screen.attrs[y] = virtual.attrs[y][:]
+
+    def init_pair(self, pair, fg, bg):
+        if not 0 < pair < self.color_pairs:
+            raise _error('init_pair')
+        self.pairs[pair] = (fg, bg)
+
+    def color_pair(self, pair):
+        # The same bits as curses.color_pair, which needs a terminal
+        return (pair << 8) & curses.A_COLOR
+
+    def pair_content(self, attr):
+        '''
+        Returns the (fg, bg) colors of the pair in attr, or None for the
+        default colors.
+        '''
+        return self.pairs.get((attr & curses.A_COLOR) >> 8)
+
+    def echo(self):
+        self.echoing = True
+
+    def noecho(self):
+        self.echoing = False
+
+    def mousemask(self, mask):
+        old, self._mousemask = self._mousemask, mask
+        return mask, old
+
+    def getmouse(self):
+        if not self._mouse:
+            raise _error('getmouse')
+        return self._mouse.popleft()
+
+    def wait_input(self, timeout=None):
+        if self._keys:
+            return
+        self._key_ready.clear()
+        self._key_ready.wait(timeout)
+
+    def push_keys(self, keys):
+        '''
+        Feeds keys to the application as if they were typed.
+
+        :param keys: integer keycodes or strings, where each character is one
+            keypress
+        '''
+        for key in keys:
+            if isinstance(key, six.string_types):
+                self._keys.extend(ord(c) for c in key)
+            else:
+                self._keys.append(key)
+        self._key_ready.set()
+
+    def push_key(self, key):
+        '''
+        Feeds a single key to the application.
+
+        :param key: integer keycode or single character
+        '''
+        self.push_keys([key])
+
+    def push_mouse(self, x, y, bstate):
+        '''
+        Feeds a mouse event to the application, if its mousemask allows it.
+
+        :param x: the x position on the screen
+        :param y: the y position on the screen
+        :param bstate: the button state, like curses.BUTTON1_CLICKED
+        '''
+        if not bstate & self._mousemask:
+            return
+        self._mouse.append((0, x, y, 0, bstate))
+        self.push_key(curses.KEY_MOUSE)
+
+    def resize(self, width, height):
+        '''
+        Resizes the screen like a terminal window being resized, and sends
+        KEY_RESIZE to the application.
+
+        :param width: the new width of the screen
+        :param height: the new height of the screen
+        '''
+        self.width, self.height = width, height
+        self._virtual.resize(height, width)
+        self._screen.resize(height, width)
+        if self.scr is not None:
+            self.scr.resize(height, width)
+        self.push_key(curses.KEY_RESIZE)
+
+    def _next_key(self):
+        if not self._keys:
+            return -1
+        return self._keys.popleft()
+
+    def screen_text(self):
+        '''
+        Returns the text on the screen, as a list of one string per row.
+        '''
+        return [''.join(row) for row in self._screen.chars]
+
+    def cell(self, x, y):
+        '''
+        Returns the character and attributes on the screen at x and y.
+
+        :return: (character, attributes)
+        '''
+        return self._screen.chars[y][x], self._screen.attrs[y][x]
+
+
+class _Cells(object):
+
+    def __init__(self, height, width):
+        self.chars = [[' '] * width for i in range(height)]
+        self.attrs = [[0] * width for i in range(height)]
+
+    def resize(self, height, width):
+        '''
+        Resizes the grid in place, keeping what fits, so windows sharing it
+        stay valid.
+        '''
+        for grid, blank in ((self.chars, ' '), (self.attrs, 0)):
+            del grid[height:]
+            for row in grid:
+                del row[width:]
+                row.extend([blank] * (width - len(row)))
+            grid.extend([blank] * width for i in range(height - len(grid)))
+
+
+def _error(func):
+    return curses.error('%s() returned ERR' % func)
+
+
+class MemoryWindow(object):
+    '''
+    An in-memory stand-in for a curses window, used by the MemoryBackend.
+    It implements the parts of the curses window API that cursed uses, with
+    the same coordinates and errors.
+
+    Subwindows share their cells with their parent, like in curses.
+    '''
+
+    def __init__(self, backend, cells, nlines, ncols, begin_y=0, begin_x=0,
+                 off_y=0, off_x=0, pad=False, parent=None):
+        self._backend = backend
+        self._cells = cells
+        self._parent = parent
+        self._h, self._w = nlines, ncols
+        self._begy, self._begx = begin_y, begin_x
+        self._oy, self._ox = off_y, off_x
+        self._pad = pad
+        self._cy, self._cx = 0, 0
+        self._scroll = False
+
+    def _args(self, args, nargs):
+        '''
+        Handles curses-style arguments which might start with y and x, moving
+        the cursor if they do, and returns the rest of them.
+        '''
+        if len(args) >= nargs + 2 or (
+            len(args) >= 2 and isinstance(args[0], int) and
+            isinstance(args[1], int) and len(args) > nargs
+        ):
+            self.move(args[0], args[1])
+            args = args[2:]
+        return args
+
+    def _set(self, y, x, ch, attr):
+        self._cells.chars[self._oy + y][self._ox + x] = ch
+        self._cells.attrs[self._oy + y][self._ox + x] = attr
+
+    def _get(self, y, x):
+        return (self._cells.chars[self._oy + y][self._ox + x],
+                self._cells.attrs[self._oy + y][self._ox + x])
+
+    def _clear_row(self, y, x=0):
+        row = self._oy + y
+        start, end = self._ox + x, self._ox + self._w
+        self._cells.chars[row][start:end] = [' '] * (end - start)
+        self._cells.attrs[row][start:end] = [0] * (end - start)
+
+    def _copy_row(self, dst, src):
+        start, end = self._ox, self._ox + self._w
+        for grid in (self._cells.chars, self._cells.attrs):
+            grid[self._oy + dst][start:end] = grid[self._oy + src][start:end]
+
+    def _newline(self, func):
+        if self._cy + 1 < self._h:
+            self._cy += 1
+        elif self._scroll:
+            self.scroll()
+        else:
+            raise _error(func)
+        self._cx = 0
+
+    def _put(self, ch, attr, func):
+        if ch == '\n':
+            self._clear_row(self._cy, self._cx)
+            self._newline(func)
+            return
+        if ch == '\r':
+            self._cx = 0
+            return
+        if ch == '\b':
+            self._cx = max(self._cx - 1, 0)
+            return
+        if ch == '\t':
+            for i in range(8 - self._cx % 8):
+                self._put(' ', attr, func)
+            return
+        cells = char_width(ch) if ch > u'\x7f' else 1
+        if cells == 0:
+            # Combining marks join the character before them
+            if self._cx:
+                prev, prev_attr = self._get(self._cy, self._cx - 1)
+                self._set(self._cy, self._cx - 1, prev + ch, prev_attr)
+            return
+        if cells == 2:
+            if self._cx + 1 == self._w:
+                # Wide characters don't get split across lines
+                self._put(' ', attr, func)
+            self._set(self._cy, self._cx, ch, attr)
+            self._cx += 1
+            # The second cell of a wide character is empty
+            ch = ''
+        self._set(self._cy, self._cx, ch, attr)
+        if self._cx + 1 < self._w:
+            self._cx += 1
+            return
+        if self._cy + 1 == self._h and not self._scroll:
+            raise _error(func)
+        self._newline(func)
+
+    @staticmethod
+    def _char(ch):
+        if isinstance(ch, int):
+            return six.unichr(ch & curses.A_CHARTEXT), ch & ~curses.A_CHARTEXT
+        if isinstance(ch, bytes):
+            ch = ch.decode('utf-8')
+        return ch, 0
+
+    @staticmethod
+    def _text(s):
+        if isinstance(s, bytes):
+            return s.decode('utf-8')
+        return s
+
+    def getmaxyx(self):
+        return self._h, self._w
+
+    def getbegyx(self):
+        return self._begy, self._begx
+
+    def getyx(self):
+        return self._cy, self._cx
+
+    def move(self, y, x):
+        if not (0 <= y < self._h and 0 <= x < self._w):
+            raise _error('wmove')
+        self._cy, self._cx = y, x
+
+    def subwin(self, *args):
+        if len(args) == 2:
+            nlines, ncols = 0, 0
+            begin_y, begin_x = args
+        else:
+            nlines, ncols, begin_y, begin_x = args
+        rel_y, rel_x = begin_y - self._begy, begin_x - self._begx
+        if nlines == 0:
+            nlines = self._h - rel_y
+        if ncols == 0:
+            ncols = self._w - rel_x
+        if (rel_y < 0 or rel_x < 0 or rel_y + nlines > self._h or
+                rel_x + ncols > self._w):
+            raise _error('subwin')
+        return MemoryWindow(self._backend, self._cells, nlines, ncols,
+                            begin_y, begin_x, self._oy + rel_y,
+                            self._ox + rel_x, parent=self)
+
+    def addstr(self, *args):
+        args = self._args(args, 2)
+        s, attr = self._text(args[0]), (args[1] if len(args) > 1 else 0)
+        for ch in s:
+            self._put(ch, attr, 'addwstr')
+
+    def addnstr(self, *args):
+        args = self._args(args, 3)
+        s, n = self._text(args[0]), args[1]
+        attr = args[2] if len(args) > 2 else 0
+        for ch in s[:n] if n >= 0 else s:
+            self._put(ch, attr, 'addnwstr')
+
+    def addch(self, *args):
+        args = self._args(args, 2)
+        ch, ch_attr = self._char(args[0])
+        attr = args[1] if len(args) > 1 else ch_attr
+        self._put(ch, attr, 'addch')
+
+    def insstr(self, *args):
+        args = self._args(args, 2)
+        s, attr = self._text(args[0]), (args[1] if len(args) > 1 else 0)
+        self._insert(s, attr)
+
+    def insnstr(self, *args):
+        args = self._args(args, 3)
+        s, n = self._text(args[0]), args[1]
+        attr = args[2] if len(args) > 2 else 0
+        self._insert(s[:n] if n > 0 else s, attr)
+
+    def insch(self, *args):
+        args = self._args(args, 2)
+        ch, ch_attr = self._char(args[0])
+        self._insert(ch, args[1] if len(args) > 1 else ch_attr)
+
+    def _insert(self, s, attr):
+        y, x = self._cy, self._cx
+        row = [self._get(y, i) for i in range(x, self._w)]
+        cells = []
+        for ch in s:
+            cells.append((ch, attr))
+            if ch > u'\x7f' and char_width(ch) == 2:
+                cells.append(('', attr))
+        row = cells + row
+        for i, (ch, a) in enumerate(row[:self._w - x]):
+            self._set(y, x + i, ch, a)
+
+    def delch(self, *args):
+        self._args(args, 0)
+        y, x = self._cy, self._cx
+        row = [self._get(y, i) for i in range(x + 1, self._w)] + [(' ', 0)]
+        for i, (ch, a) in enumerate(row):
+            self._set(y, x + i, ch, a)
+
+    def instr(self, *args):
+        args = self._args(args, 1)
+        n = args[0] if args else self._w
+        n = min(n, self._w - self._cx)
+        chars = self._cells.chars[self._oy + self._cy]
+        start = self._ox + self._cx
+        return ''.join(chars[start:start + n]).encode('utf-8')
+
+    def inch(self, *args):
+        self._args(args, 0)
+        ch, attr = self._get(self._cy, self._cx)
+        return ord(ch) | attr
+
+    def hline(self, *args):
+        args = self._args(args, 2)
+        ch, attr = self._char(args[0])
+        for x in range(self._cx, min(self._cx + args[1], self._w)):
+            self._set(self._cy, x, ch, attr)
+
+    def vline(self, *args):
+        args = self._args(args, 2)
+        ch, attr = self._char(args[0])
+        for y in range(self._cy, min(self._cy + args[1], self._h)):
+            self._set(y, self._cx, ch, attr)
+
+    def border(self, ls='|', rs='|', ts='-', bs='-', tl='+', tr='+', bl='+',
+               br='+'):
+        ls, rs, ts, bs, tl, tr, bl, br = [
+            self._char(c)[0] if c else d for c, d in zip(
+                (ls, rs, ts, bs, tl, tr, bl, br),
+                ('|', '|', '-', '-', '+', '+', '+', '+'))
+        ]
+        h, w = self._h - 1, self._w - 1
+        for x in range(1, w):
+            self._set(0, x, ts, 0)
+            self._set(h, x, bs, 0)
+        for y in range(1, h):
+            self._set(y, 0, ls, 0)
+            self._set(y, w, rs, 0)
+        self._set(0, 0, tl, 0)
+        self._set(0, w, tr, 0)
+        self._set(h, 0, bl, 0)
+        self._set(h, w, br, 0)
+
+    def erase(self):
+        for y in range(self._h):
+            self._clear_row(y)
+        self._cy, self._cx = 0, 0
+
+    clear = erase
+
+    def clrtoeol(self):
+        self._clear_row(self._cy, self._cx)
+
+    def clrtobot(self):
+        self._clear_row(self._cy, self._cx)
+        for y in range(self._cy + 1, self._h):
+            self._clear_row(y)
+
+    def scroll(self, lines=1):
+        if not self._scroll:
+            raise _error('scroll')
+        for i in range(lines):
+            for y in range(self._h - 1):
+                self._copy_row(y, y + 1)
+            self._clear_row(self._h - 1)
+
+    def deleteln(self):
+        for y in range(self._cy, self._h - 1):
+            self._copy_row(y, y + 1)
+        self._clear_row(self._h - 1)
+
+    def insertln(self):
+        for y in range(self._h - 1, self._cy, -1):
+            self._copy_row(y, y - 1)
+        self._clear_row(self._cy)
+
+    def scrollok(self, flag):
+        self._scroll = bool(flag)
+
+    def mvwin(self, y, x):
+        self._begy, self._begx = y, x
+
+    def resize(self, nlines, ncols):
+        if self._parent is None:
+            self._cells.resize(nlines, ncols)
+        self._h, self._w = nlines, ncols
+        self._cy = min(self._cy, nlines - 1)
+        self._cx = min(self._cx, ncols - 1)
+
+    def idlok(self, flag):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def notimeout(self, flag):
+        pass
+
+    def clearok(self, flag):
+        pass
+
+    def leaveok(self, flag):
+        pass
+
+    def touchwin(self):
+        pass
+
+    def is_linetouched(self, line):
+        return True
+
+    def is_wintouched(self):
+        return True
+
+    def noutrefresh(self, *args):
+        virtual = self._backend._virtual
+        if self._pad:
+            pminrow, pmincol, sminrow, smincol, smaxrow, smaxcol = args
+        else:
+            pminrow, pmincol = 0, 0
+            sminrow, smincol = self._begy, self._begx
+            smaxrow = sminrow + self._h - 1
+            smaxcol = smincol + self._w - 1
+        smaxrow = min(smaxrow, self._backend.height - 1,
+                      sminrow + self._h - 1 - pminrow)
+        smaxcol = min(smaxcol, self._backend.width - 1,
+                      smincol + self._w - 1 - pmincol)
+        for sy in range(sminrow, smaxrow + 1):
+            y = self._oy + pminrow + sy - sminrow
+            start = self._ox + pmincol
+            end = start + smaxcol - smincol + 1
+            virtual.chars[sy][smincol:smaxcol + 1] = \
+                self._cells.chars[y][start:end]
+            virtual.attrs[sy][smincol:smaxcol + 1] = \
+                self._cells.attrs[y][start:end]
+
+    def refresh(self, *args):
+        self.noutrefresh(*args)
+        self._backend.doupdate()
+
+    def getch(self, *args):
+        if args:
+            self.move(*args)
+        return self._backend._next_key()
+
+    def getstr(self, *args):
+        args = self._args(args, 1)
+        n = args[0] if args else None
+        chars = []
+        while n is None or len(chars) < n:
+            c = self._backend._next_key()
+            if c in (-1, 10, 13):
+                break
+            chars.append(six.unichr(c))
+            if self._backend.echoing:
+                self._put(chars[-1], 0, 'wgetnstr')
+        return ''.join(chars).encode('utf-8')
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+'''
+cursed.bench
+
+Benchmarks for the hot loops of cursed, run on the in-memory backend so the
+numbers don't depend on a terminal.
+
+Run it with either of:
+::
+
+    $ cursed-bench
+    $ python -m cursed.bench --duration 5 --workload windows --workload idle
+
+Each workload reports frames, window refreshes and window updates per second.
+The app runs without a frame rate cap by default, so the numbers follow how
+fast the render, input and window loops are rather than ``max_fps``.
+The latency workload also reports the p50 and p99 time from a key being typed
+to the frame that paints it, and the idle workload reports the CPU seconds
+used per minute while nothing happens.
+'''
+
+import time
+import curses
+import argparse
+import gevent
+from timeit import default_timer
+
+from cursed.app import CursedApp
+from cursed.meta import CursedWindowClass
+from cursed.window import CursedWindow
+from cursed.menu import CursedMenu, _Menu as Menu
+from cursed.backend import MemoryBackend
+
+process_time = getattr(time, 'process_time', None) or time.clock
+
+WORKLOADS = ('windows', 'scroll', 'pad', 'menu', 'latency', 'idle')
+
+
+class _BenchBackend(MemoryBackend):
+    '''
+    A MemoryBackend which records how long painted keys waited for their
+    frame.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(_BenchBackend, self).__init__(*args, **kwargs)
+        self.handled = []
+        self.latencies = []
+
+    def doupdate(self):
+        super(_BenchBackend, self).doupdate()
+        now = default_timer()
+        self.latencies += [now - typed for typed in self.handled]
+        self.handled = []
+
+
+def _reset():
+    '''
+    Forgets every window and menu declared so far, so each workload starts
+    with only its own.
+    '''
+    del CursedWindowClass.WINDOWS[:]
+    del Menu.ALL[:]
+    Menu.KEY_MAP.clear()
+    Menu.TITLE_MAP.clear()
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100.0), len(values) - 1)]
+
+
+def _windows(width, height):
+    '''
+    Many bordered windows rewriting their text every update, like
+    tests/test.py.
+    '''
+    cols, rows = 4, 4
+    for i in range(cols * rows):
+        class BorderedWindow(CursedWindow):
+            X, Y = (i % cols) * (width // cols), (i // cols) * (height // rows)
+            WIDTH, HEIGHT = width // cols, height // rows
+            BORDERED = True
+            n = 0
+
+            @classmethod
+            def update(cls):
+                cls.n += 1
+                cls.write('0,0', x=0, y=0)
+                cls.write('%d' % cls.n, x=1, y=1)
+                cls.refresh()
+
+
+def _scroll(width, height):
+    '''
+    A window streaming lines, like examples/scrolls.py.
+    '''
+    class ScrollingWindow(CursedWindow):
+        WIDTH, HEIGHT = width, height
+        SCROLL = True
+        i = 0
+
+        @classmethod
+        def update(cls):
+            cls.addstr('{}'.format(cls.i))
+            cls.nextline()
+            cls.i += 1
+            cls.refresh()
+
+
+def _pad(width, height):
+    '''
+    A large pad panned around by arrow keys, like examples/pad.py.
+    '''
+    class MainPad(CursedWindow):
+        WIDTH, HEIGHT = width, height
+        PAD = True
+        PAD_WIDTH, PAD_HEIGHT = width * 4, height * 4
+        UPDATE_ON_EVENT = True
+
+        @classmethod
+        def init(cls):
+            for y in range(cls.PAD_HEIGHT - 1):
+                cls.addstr('.#' * (cls.PAD_WIDTH // 2), 0, y)
+
+        @classmethod
+        def update(cls):
+            for key, count in cls.getkeys(coalesce=True):
+                if key == curses.KEY_RIGHT:
+                    cls.PAD_X = (cls.PAD_X + count) % (
+                        cls.PAD_WIDTH - cls.WIDTH)
+                elif key == curses.KEY_DOWN:
+                    cls.PAD_Y = (cls.PAD_Y + count) % (
+                        cls.PAD_HEIGHT - cls.HEIGHT)
+            cls.refresh()
+
+    def press(backend):
+        while True:
+            backend.push_keys([curses.KEY_RIGHT] * 7 + [curses.KEY_DOWN])
+            gevent.sleep(0)
+    return press
+
+
+def _menu(width, height):
+    '''
+    A window with a menu opened and closed over and over.
+    '''
+    class MenuWindow(CursedWindow):
+        WIDTH, HEIGHT = width, height
+        MENU = CursedMenu()
+        MENU.add_menu('File', key='f', items=[
+            ('Save', 's', 'save'),
+            ('Quit', 'q', 'quit'),
+        ])
+        MENU.add_menu('Edit', key='e', items=[
+            ('Copy', 'c', 'copy'),
+        ])
+        UPDATE_ON_EVENT = True
+
+        @classmethod
+        def update(cls):
+            cls.refresh()
+
+    def press(backend):
+        while True:
+            backend.push_key('f')
+            while MenuWindow._OPENED_MENU is None:
+                gevent.sleep(0)
+            backend.push_key(27)
+            while MenuWindow._OPENED_MENU is not None:
+                gevent.sleep(0)
+    return press
+
+
+def _latency(width, height):
+    '''
+    A window painting every key it gets, to measure key-to-paint latency.
+    '''
+    typed = []
+
+    class KeyWindow(CursedWindow):
+        WIDTH, HEIGHT = width, height
+        UPDATE_ON_EVENT = True
+
+        @classmethod
+        def update(cls):
+            key = cls.getch()
+            while key is not None:
+                cls.addstr('key %d' % key, 0, 0)
+                cls.refresh()
+                cls.APP.backend.handled.append(typed.pop(0))
+                key = cls.getch()
+
+    def press(backend):
+        while True:
+            typed.append(default_timer())
+            backend.push_key(ord('a') + len(backend.latencies) % 26)
+            gevent.sleep(0.005)
+    return press
+
+
+def _idle(width, height):
+    '''
+    A dashboard of windows that redraw once a second, with nobody typing.
+    '''
+    for i in range(4):
+        class DashboardWindow(CursedWindow):
+            X, Y = 0, i * (height // 4)
+            WIDTH, HEIGHT = width, height // 4
+            BORDERED = True
+            UPDATE_INTERVAL = 1
+            UPDATE_ON_EVENT = True
+
+            @classmethod
+            def update(cls):
+                cls.write(time.strftime('%H:%M:%S'), x=0, y=0)
+                cls.refresh()
+
+
+def run_workload(name, duration=2.0, width=80, height=24, max_fps=None):
+    '''
+    Runs a single workload for duration seconds on a MemoryBackend.
+
+    :param name: one of the names in ``WORKLOADS``
+    :param duration: seconds to run the workload
+    :param width: width of the screen
+    :param height: height of the screen
+    :param max_fps: the ``max_fps`` of the CursedApp, default no cap
+    :return: dict of the measurements
+    '''
+    _reset()
+    backend = _BenchBackend(width=width, height=height)
+    app = CursedApp(backend=backend, max_fps=max_fps)
+    press = globals()['_' + name](width, height)
+    windows = list(CursedWindowClass.WINDOWS)
+
+    def stop():
+        gevent.sleep(duration)
+        for cw in windows:
+            cw.trigger('quit')
+
+    threads = [gevent.spawn(stop)]
+    if press is not None:
+        threads += [gevent.spawn(press, backend)]
+    start, cpu_start = default_timer(), process_time()
+    result = app.run()
+    elapsed, cpu = default_timer() - start, process_time() - cpu_start
+    gevent.killall(threads)
+    _reset()
+    result.unwrap()
+    stats = {
+        'workload': name,
+        'seconds': elapsed,
+        'frames/s': app.stats['frames'] / elapsed,
+        'refreshes/s': app.stats['refreshes'] / elapsed,
+        'skipped/s': app.stats['skipped_refreshes'] / elapsed,
+        'updates/s': app.stats['updates'] / elapsed,
+        'cpu s/min': cpu / elapsed * 60,
+    }
+    if backend.latencies:
+        stats['p50 ms'] = _percentile(backend.latencies, 50) * 1000
+        stats['p99 ms'] = _percentile(backend.latencies, 99) * 1000
+    return stats
+
+
+def run_benchmarks(names=WORKLOADS, **kwargs):
+    '''
+    Runs each workload in names, taking the same keyword arguments as
+    ``run_workload``.
+
+    :return: list of the measurement dicts
+    '''
+    return [run_workload(name, **kwargs) for name in names]
+
+
+def _format(results):
+    columns = ('frames/s', 'refreshes/s', 'skipped/s', 'updates/s',
+               'cpu s/min', 'p50 ms', 'p99 ms')
+    lines = ['%-10s' % 'workload' + ''.join('%13s' % c for c in columns)]
+    for stats in results:
+        line = '%-10s' % stats['workload']
+        for column in columns:
+            value = stats.get(column)
+            line += '%13s' % ('-' if value is None else '%.2f' % value)
+        lines += [line]
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark cursed')
+    parser.add_argument('--workload', '-w', action='append', choices=WORKLOADS,
+                        help='workload to run, default all of them')
+    parser.add_argument('--duration', '-d', type=float, default=2.0,
+                        help='seconds to run each workload, default 2')
+    parser.add_argument('--width', type=int, default=80)
+    parser.add_argument('--height', type=int, default=24)
+    parser.add_argument('--max-fps', type=int, default=0,
+                        help='frame rate cap of the app, default 0 for none')
+    args = parser.parse_args()
+    results = run_benchmarks(
+        args.workload or WORKLOADS, duration=args.duration,
+        width=args.width, height=args.height, max_fps=args.max_fps or None,
+    )
+    print(_format(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+'''
+cursed.events
+
+The queue of triggered callbacks each CursedWindow has in its EVENTS.
+'''
+
+from collections import deque
+from gevent.event import Event
+from gevent.queue import Empty
+from cursed.exceptions import CursedCallbackError
+
+POLICIES = ('block', 'drop-oldest', 'coalesce')
+
+
+class CursedEventQueue(object):
+    '''
+    A queue of (func_name, args, kwargs, future) callbacks, unbounded by
+    default, with a policy for when it is full:
+
+    - block: the triggering greenlet waits for room, the default. A window
+      can't wait for room in its own queue, so it gets a CursedCallbackError
+      instead.
+    - drop-oldest: the oldest callback is dropped
+    - coalesce: a callback replaces the arguments of a pending callback of
+      the same name instead of being queued, so a window only runs the
+      latest one. When the queue is full of different names the oldest is
+      dropped.
+
+    Dropped callbacks fail their futures with CursedCallbackError.
+    Callbacks put with priority, like quit, skip ahead of everything else.
+
+    :param maxsize: the most callbacks kept, or None for no limit
+    :param policy: one of 'block', 'drop-oldest' or 'coalesce'
+    '''
+
+    def __init__(self, maxsize=None, policy='block'):
+        if policy not in POLICIES:
+            raise ValueError('EVENT_POLICY should be one of %s, not %r' % (
+                ', '.join(POLICIES), policy))
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._events = deque()
+        self._priority = deque()
+        self._pending = {}
+        self._room = Event()
+
+    def qsize(self):
+        return len(self._events) + len(self._priority)
+
+    def empty(self):
+        return not (self._events or self._priority)
+
+    def full(self):
+        return self.maxsize is not None and len(self._events) >= self.maxsize
+
+    def put(self, event, priority=False, block=True):
+        '''
+        Queues a (func_name, args, kwargs, future) callback.
+
+        :param event: the callback tuple
+        :param priority: run it before every other pending callback
+        :param block: whether the block policy may wait for room
+        :raises CursedCallbackError: if the block policy can't wait for room
+        '''
+        if priority:
+            self._priority.append(event)
+            return
+        func_name, args, kwargs, future = event
+        if self.policy == 'coalesce' and func_name in self._pending:
+            pending = self._pending[func_name]
+            pending[1], pending[2] = args, kwargs
+            # Whoever waits on the replaced call gets the latest call's result
+            pending[3].rawlink(future)
+            return
+        while self.full():
+            if self.policy != 'block':
+                self._drop()
+            elif block:
+                self._room.clear()
+                self._room.wait()
+            else:
+                raise CursedCallbackError(
+                    'callback %s would wait for room in a full queue of %d '
+                    'callbacks' % (func_name, self.maxsize))
+        entry = [func_name, args, kwargs, future]
+        self._events.append(entry)
+        if self.policy == 'coalesce':
+            self._pending[func_name] = entry
+
+    def _drop(self):
+        func_name, args, kwargs, future = self._pop()
+        self.dropped += 1
+        future.set_exception(CursedCallbackError(
+            'callback %s was dropped from a full queue' % func_name))
+
+    def _pop(self):
+        entry = self._events.popleft()
+        if self._pending.get(entry[0]) is entry:
+            del self._pending[entry[0]]
+        self._room.set()
+        return tuple(entry)
+
+    def get(self):
+        '''
+        Returns the next callback, without waiting.
+        '''
+        if self._priority:
+            return self._priority.popleft()
+        if not self._events:
+            raise Empty()
+        return self._pop()
+
+    get_nowait = get
@@ -22,6 +22,14 @@ class CursedPadError(ValueError):
     pass
 
 
+class CursedStyleError(ValueError):
+    '''
+    Raised when a style can't be parsed, like an unknown attribute or color
+    name in 'bold purple on blue'.
+    '''
+    pass
+
+
 class CursedSizeError(RuntimeError):
     '''
     Raised when a terminal size issue occurs, such as the menu not fitting in
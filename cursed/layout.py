@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+'''
+cursed.layout
+
+Layouts place windows by splitting the screen, instead of giving every window
+an absolute X, Y, WIDTH and HEIGHT.
+Windows placed by a layout declare their size as 'layout', and the layout is
+given to the app with ``CursedApp.set_layout``:
+::
+
+    class Sidebar(CursedWindow):
+        WIDTH, HEIGHT = 'layout', 'layout'
+        ...
+
+    app.set_layout(CursedHSplit(
+        CursedPane(Sidebar, size='25%', min_size=20, max_size=40),
+        CursedVSplit(Main, CursedPane(Status, size=1)),
+    ))
+
+Sizes are a number of cells, a percentage like '30%', a fraction like 0.3, or
+None to share what is left with the other children sized None.
+
+The geometry of every node is cached. When the terminal is resized or a
+node's constraints are changed with ``set``, only the splits whose space or
+constraints changed are solved again, and only the windows that moved are
+recreated.
+'''
+
+import abc
+import six
+from cursed.exceptions import CursedWindowError
+
+
+@six.add_metaclass(abc.ABCMeta)
+class CursedLayout(object):
+    '''
+    The abstract base of all layout nodes. Subclasses place their windows in
+    ``_layout`` and list them in ``windows``.
+
+    :param size: cells, a percentage like '30%', a fraction like 0.3, or None
+        to share the remaining space, default None
+    :param min_size: the fewest cells to give this node, default none
+    :param max_size: the most cells to give this node, default none
+    '''
+
+    def __init__(self, size=None, min_size=None, max_size=None):
+        self.parent = None
+        self._rect = None
+        self._dirty = True
+        self._check(size)
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+
+    @staticmethod
+    def _check(size):
+        if size is None or isinstance(size, (int, float)):
+            return
+        if isinstance(size, six.string_types) and size.endswith('%'):
+            try:
+                float(size[:-1])
+                return
+            except ValueError:
+                pass
+        raise CursedWindowError('layout size should be a number of cells, a '
+                                'percentage like "30%" or a fraction, not {!r}'
+                                .format(size))
+
+    def set(self, **kwargs):
+        '''
+        Changes the size, min_size or max_size of the node. The change is
+        applied the next time ``CursedApp.relayout`` is called.
+        '''
+        if 'size' in kwargs:
+            self._check(kwargs['size'])
+        for key, value in kwargs.items():
+            if key not in ('size', 'min_size', 'max_size'):
+                raise TypeError('unexpected keyword argument {!r}'.format(key))
+            setattr(self, key, value)
+        node = self
+        while node is not None:
+            node._dirty = True
+            node = node.parent
+
+    def _cells(self, total):
+        '''
+        Returns how many of total cells the size asks for, or None for an
+        even share of the remainder.
+        '''
+        size = self.size
+        if size is None:
+            return None
+        if isinstance(size, six.string_types):
+            size = float(size[:-1]) / 100
+        if isinstance(size, float):
+            size = int(total * size)
+        return self._clamp(size)
+
+    def _clamp(self, cells):
+        if self.max_size is not None:
+            cells = min(cells, self.max_size)
+        if self.min_size is not None:
+            cells = max(cells, self.min_size)
+        return max(cells, 0)
+
+    def _apply(self, x, y, width, height):
+        '''
+        Lays out the node in the rectangle, unless it was already laid out
+        there and none of its constraints changed since.
+        '''
+        rect = (x, y, width, height)
+        if rect == self._rect and not self._dirty:
+            return
+        self._rect = rect
+        self._dirty = False
+        self._layout(x, y, width, height)
+
+    @abc.abstractmethod
+    def _layout(self, x, y, width, height):
+        '''
+        Places the node's windows in the rectangle.
+        '''
+
+    @abc.abstractmethod
+    def windows(self):
+        '''
+        Returns every window class placed by this node.
+        '''
+
+
+class CursedPane(CursedLayout):
+    '''
+    A layout node which places a single window.
+
+    :param window: the CursedWindow class to place
+    '''
+
+    def __init__(self, window, size=None, min_size=None, max_size=None):
+        super(CursedPane, self).__init__(size=size, min_size=min_size,
+                                         max_size=max_size)
+        self.window = window
+
+    def _layout(self, x, y, width, height):
+        win = self.window
+        win.X, win.Y, win.WIDTH, win.HEIGHT = x, y, width, height
+
+    def windows(self):
+        return [self.window]
+
+
+class _Split(CursedLayout):
+    '''
+    Shares its space between its children along one axis.
+    Children can be layout nodes, or window classes which are placed in a
+    CursedPane sharing the remaining space.
+    '''
+
+    def __init__(self, *children, **kwargs):
+        super(_Split, self).__init__(**kwargs)
+        self.children = []
+        for child in children:
+            if not isinstance(child, CursedLayout):
+                child = CursedPane(child)
+            child.parent = self
+            self.children += [child]
+
+    def _solve(self, total):
+        '''
+        Returns the cells given to each child out of total.
+        Children with a size get it first, then the rest is shared by the
+        children sized None, within their min_size and max_size. If the
+        children ask for more than there is, the last ones are cut off.
+        '''
+        sizes = [child._cells(total) for child in self.children]
+        flexible = [i for i, size in enumerate(sizes) if size is None]
+        while flexible:
+            left = max(total - sum(s for s in sizes if s is not None), 0)
+            share, extra = divmod(left, len(flexible))
+            for n, i in enumerate(flexible):
+                sizes[i] = share + (1 if n < extra else 0)
+            clamped = [i for i in flexible
+                       if self.children[i]._clamp(sizes[i]) != sizes[i]]
+            if not clamped:
+                break
+            for i in flexible:
+                if i in clamped:
+                    sizes[i] = self.children[i]._clamp(sizes[i])
+                else:
+                    sizes[i] = None
+            flexible = [i for i in flexible if i not in clamped]
+        left = total
+        for i, size in enumerate(sizes):
+            sizes[i] = min(size, left)
+            left -= sizes[i]
+        return sizes
+
+    def windows(self):
+        return [win for child in self.children for win in child.windows()]
+
+
+class CursedHSplit(_Split):
+    '''
+    Places its children side by side, from left to right.
+
+    :param children: layout nodes or CursedWindow classes
+    :param size: like in CursedLayout, for when this is inside another split
+    '''
+
+    def _layout(self, x, y, width, height):
+        for child, size in zip(self.children, self._solve(width)):
+            child._apply(x, y, size, height)
+            x += size
+
+
+class CursedVSplit(_Split):
+    '''
+    Stacks its children from top to bottom.
+
+    :param children: layout nodes or CursedWindow classes
+    :param size: like in CursedLayout, for when this is inside another split
+    '''
+
+    def _layout(self, x, y, width, height):
+        for child, size in zip(self.children, self._solve(height)):
+            child._apply(x, y, width, size)
+            y += size
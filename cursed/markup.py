@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+'''
+cursed.markup
+
+Text with inline styles, written with ``CursedWindow.write_markup``:
+::
+
+    cls.write_markup('[bold]CPU[/] 93% [bold red on black]HOT[/]', 0, 0)
+
+A tag is any style or style name from ``cursed.style``, and styles the text
+up to the matching [/]. Tags can be nested, in which case the attributes add
+up and the inner colors win. Write [[ for a literal [.
+
+Each template is parsed once into runs of text sharing a style, and the last
+MARKUP_CACHE_SIZE templates are kept, so a window redrawing the same status
+line many times a second only ever parses it once. ``define_style`` empties
+the cache, so templates using a redefined name pick up its new style.
+'''
+
+import re
+from collections import OrderedDict
+from cursed.exceptions import CursedStyleError
+from cursed.style import get_style, _ON_DEFINE
+
+MARKUP_CACHE_SIZE = 256
+
+_TAG = re.compile(r'\[\[|\[([^\[\]]*)\]')
+_CACHE = OrderedDict()
+_ON_DEFINE.append(_CACHE.clear)
+
+
+def parse(template):
+    '''
+    Returns the lines of template, each a list of (text, style) runs where
+    style is a CursedStyle or None for unstyled text.
+
+    :param template: the text with markup
+    :return: list of lists of (text, style)
+    '''
+    lines = _CACHE.pop(template, None)
+    if lines is None:
+        lines = _parse(template)
+        if len(_CACHE) >= MARKUP_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    _CACHE[template] = lines
+    return lines
+
+
+def _parse(template):
+    runs = []
+    styles = [None]
+    text = ''
+    pos = 0
+    for match in _TAG.finditer(template):
+        text += template[pos:match.start()]
+        pos = match.end()
+        tag = match.group(1)
+        if tag is None:
+            text += '['
+            continue
+        if text:
+            runs.append((text, styles[-1]))
+            text = ''
+        if tag == '/':
+            if len(styles) == 1:
+                raise CursedStyleError('[/] without an open tag in {!r}'
+                                       .format(template))
+            styles.pop()
+            continue
+        style = get_style(tag.strip())
+        if styles[-1] is not None:
+            style = styles[-1].combine(style)
+        styles.append(style)
+    text += template[pos:]
+    if text:
+        runs.append((text, styles[-1]))
+    lines = [[]]
+    for text, style in runs:
+        for i, part in enumerate(text.split('\n')):
+            if i:
+                lines.append([])
+            if part:
+                lines[-1].append((part, style))
+    return lines
@@ -5,10 +5,15 @@ cursed.meta
 This contains the metaclass used to decorate all user classes that subclass
 CursedWindow, crucial for the curses interface to work.
 '''
-from six.moves.queue import Queue
+from collections import deque, OrderedDict
+from gevent.event import Event
+from gevent.queue import Queue
 from .exceptions import CursedPadError, CursedWindowError
+from .ring import CursedRing
+from .events import CursedEventQueue, POLICIES
 
-BASE_CURSED_CLASSES = ('CursedWindowClass', 'CursedWindow', 'CursedMenu')
+BASE_CURSED_CLASSES = ('CursedWindowClass', 'CursedWindow', 'CursedMenu',
+                       'CursedViewer', 'CursedTail')
 
 
 class CursedWindowClass(type):
@@ -18,6 +23,9 @@ class CursedWindowClass(type):
     '''
 
     WINDOWS = []
+    # Bumped when an attribute of any window class is deleted, since that can
+    # remove a callback of its subclasses too
+    _CW_GENERATION = 0
 
     def __new__(cls, name, parents, dct):
         new = super(CursedWindowClass, cls).__new__(cls, name, parents, dct)
@@ -29,9 +37,18 @@ class CursedWindowClass(type):
         new.HEIGHT = dct.get('HEIGHT')
         if new.WIDTH is None or new.HEIGHT is None:
             raise CursedWindowError('specify WIDTH and HEIGHT for {name}, '
-                                    'either as "max" or a positive integer'
-                                    .format(name=name))
-        new.PAD = dct.get('PAD', False)
+                                    'either as "max", "layout" or a positive '
+                                    'integer'.format(name=name))
+        # Keep the declared size, since 'max' is recomputed on resizes
+        new._CW_SIZE = (new.WIDTH, new.HEIGHT)
+        new.VIRTUAL_PAD = dct.get('VIRTUAL_PAD', False)
+        new.PAD = dct.get('PAD', False) or new.VIRTUAL_PAD
+        new.TILE_WIDTH = dct.get('TILE_WIDTH', 64)
+        new.TILE_HEIGHT = dct.get('TILE_HEIGHT', 16)
+        new.TILE_CACHE_SIZE = dct.get('TILE_CACHE_SIZE', 64)
+        new._CW_TILES = OrderedDict()
+        new._CW_STORE = {}
+        new._CW_TILE_POS = None
         new.PAD_WIDTH = dct.get('PAD_WIDTH')
         new.PAD_HEIGHT = dct.get('PAD_HEIGHT')
         new.PAD_X = dct.get('PAD_X', 0)
@@ -43,32 +60,94 @@ class CursedWindowClass(type):
         if new.PAD and new.BORDERED:
             raise CursedPadError('{name} cant be both a PAD and BORDERED'
                                  .format(name=name))
+        # Where coordinates inside the border and below the menu start
+        new._CW_OX = 1 if new.BORDERED else 0
+        new._CW_OY = new._CW_OX + (1 if dct.get('MENU') else 0)
         new.SCROLL = dct.get('SCROLL', False)
+        new.SCROLLBACK = dct.get('SCROLLBACK', 0)
+        new._CW_SCROLLBACK = CursedRing(new.SCROLLBACK)
+        new._CW_HISTORY_POS = None
+        new._CW_HISTORY_PAD = None
+        new._CW_HISTORY_STALE = False
         if new.PAD and new.SCROLL:
             raise CursedPadError('{name} cant be both a PAD and SCROLL'
                                  .format(name=name))
         new.WINDOW = None
         new.APP = None
-        new.EVENTS = Queue()
-        new.RESULTS = Queue()
-        new.KEY_EVENTS = Queue()
+        new.EVENT_QUEUE_SIZE = dct.get('EVENT_QUEUE_SIZE', 0)
+        new.EVENT_POLICY = dct.get('EVENT_POLICY', 'block')
+        if new.EVENT_POLICY not in POLICIES:
+            raise CursedWindowError('EVENT_POLICY for {name} should be one of '
+                                    '{policies}'.format(
+                                        name=name,
+                                        policies=', '.join(POLICIES)))
+        new.EVENTS = CursedEventQueue(maxsize=new.EVENT_QUEUE_SIZE or None,
+                                      policy=new.EVENT_POLICY)
+        new.RESULTS_SIZE = dct.get('RESULTS_SIZE', 100)
+        new.RESULTS = Queue(maxsize=new.RESULTS_SIZE or None)
+        new.KEY_EVENTS = Queue(maxsize=dct.get('KEY_QUEUE_SIZE', 1024))
+        new.MOUSE_EVENTS = deque(maxlen=dct.get('KEY_QUEUE_SIZE', 1024))
+        # The last mouse event that cut a wait for a key short
+        new._CW_MOUSE_SEEN = [None]
         new.WAIT = dct.get('WAIT', True)
+        new.UPDATE_INTERVAL = dct.get('UPDATE_INTERVAL', None)
+        new.UPDATE_ON_EVENT = dct.get('UPDATE_ON_EVENT', False)
+        new.WANTS_KEYS = dct.get('WANTS_KEYS', False)
+        new._CW_WAKE = Event()
+        new._CW_REFRESH = False
+        new._CW_DIRTY = True
+        new._CW_PAD_POS = None
+        new._CW_HIDDEN = False
+        # The shadow cursor, (y, x) where the last drawing call left the
+        # cursor, or None if curses has to be asked. It is kept in a list so
+        # drawing calls update it without the cost of setting a class
+        # attribute.
+        new._CW_CURSOR = [None]
+        new._CW_MAXYX = (0, 0)
         new.MENU = dct.get('MENU', None)
         new._MENU_MAP = {}
         new._OPENED_MENU = None
         new._SELECTED_ITEM = None
+        new._CW_CALLBACKS = (None, None)
+        new._cw_callbacks()
         cls.WINDOWS += [new]
         return new
 
+    def __delattr__(cls, name):
+        CursedWindowClass._CW_GENERATION += 1
+        super(CursedWindowClass, cls).__delattr__(name)
+
+    def _cw_callbacks(cls):
+        '''
+        Returns the table of the window's callbacks, from each name that can
+        be triggered to the bound function. It is built when the class is
+        created, and again after ``invalidate_callbacks`` or after an
+        attribute of a window class is deleted.
+        '''
+        generation, table = cls._CW_CALLBACKS
+        if generation == CursedWindowClass._CW_GENERATION:
+            return table
+        table = {}
+        for name in dir(cls):
+            if name.startswith('__'):
+                continue
+            func = getattr(cls, name, None)
+            if callable(func) and not isinstance(func, type):
+                table[name] = func
+        cls._CW_CALLBACKS = (CursedWindowClass._CW_GENERATION, table)
+        return table
+
     @classmethod
     def _fix_windows(cls, maxw, maxh):
         '''
         Fixes all windows for which width or height is specified as 'max'.
+        Windows sized 'layout' are left for the app's layout to place.
         '''
         if not cls.WINDOWS:
             return
         for win in cls.WINDOWS:
-            if win.WIDTH == 'max':
-                win.WIDTH = maxw - win.X
-            if win.HEIGHT == 'max':
-                win.HEIGHT = maxh - win.Y
+            width, height = win._CW_SIZE
+            if width != 'layout':
+                win.WIDTH = maxw - win.X if width == 'max' else width
+            if height != 'layout':
+                win.HEIGHT = maxh - win.Y if height == 'max' else height
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+'''
+cursed.mouse
+
+Mouse events, and the index used to find which window and menu is under the
+mouse pointer.
+Mouse support is enabled with ``CursedApp(mouse=True)``, and windows read their
+events with ``cls.getmouse()``.
+'''
+
+import curses
+from cursed.menu import _Menu as Menu
+from cursed.width import width as text_width
+
+# Older curses builds don't define the fifth button, which is the wheel down
+BUTTON5_PRESSED = getattr(curses, 'BUTTON5_PRESSED', 0x200000)
+_CLICKS = (curses.BUTTON1_PRESSED | curses.BUTTON1_CLICKED |
+           curses.BUTTON2_PRESSED | curses.BUTTON2_CLICKED |
+           curses.BUTTON3_PRESSED | curses.BUTTON3_CLICKED)
+
+
+class CursedMouseEvent(object):
+    '''
+    A mouse event sent to the window under the pointer.
+
+    x and y are relative to the window like in ``addstr``, so y is -1 on the
+    menu bar, and they include PAD_X and PAD_Y for pads.
+    screen_x and screen_y are the position on the terminal.
+    count is how many motion or wheel events were merged into this one.
+    '''
+
+    def __init__(self, x, y, screen_x, screen_y, bstate, menu=None):
+        self.x, self.y = x, y
+        self.screen_x, self.screen_y = screen_x, screen_y
+        self.bstate = bstate
+        self.menu = menu
+        self.count = 1
+
+    def clicked(self, button=None):
+        '''
+        Returns True if a button was pressed or clicked.
+
+        :param button: optional button number 1 to 3, default any of them
+        '''
+        if button is None:
+            return bool(self.bstate & _CLICKS)
+        return bool(self.bstate & (
+            getattr(curses, 'BUTTON%d_PRESSED' % button) |
+            getattr(curses, 'BUTTON%d_CLICKED' % button)
+        ))
+
+    def wheel(self):
+        '''
+        Returns -1 for the wheel scrolling up, 1 for down, or 0.
+        '''
+        if self.bstate & curses.BUTTON4_PRESSED:
+            return -1
+        if self.bstate & BUTTON5_PRESSED:
+            return 1
+        return 0
+
+    def motion(self):
+        '''
+        Returns True if the pointer moved without any button event.
+        '''
+        return self.bstate == curses.REPORT_MOUSE_POSITION
+
+    def _merge(self, event):
+        '''
+        Merges a following event into this one if both are motion, or both
+        scroll the wheel the same way.
+        '''
+        if self.menu is not None or event.menu is not None:
+            return False
+        if not ((self.motion() and event.motion()) or
+                (self.wheel() and self.bstate == event.bstate)):
+            return False
+        self.x, self.y = event.x, event.y
+        self.screen_x, self.screen_y = event.screen_x, event.screen_y
+        self.count += event.count
+        return True
+
+    def __repr__(self):
+        return 'CursedMouseEvent(x=%d, y=%d, bstate=%#x, count=%d)' % (
+            self.x, self.y, self.bstate, self.count)
+
+
+class _HitIndex(object):
+    '''
+    The spans of every window and menu title on each row of the screen, built
+    once per layout so finding what's under the pointer doesn't need to check
+    every window.
+    '''
+
+    def __init__(self, windows, width, height):
+        self.rows = [[] for i in range(height)]
+        self.menus = {}
+        # Later windows are drawn over earlier ones, so they're checked first
+        for cw in reversed(windows):
+            top = max(cw.Y, 0)
+            bottom = min(cw.Y + cw.HEIGHT, height)
+            span = (max(cw.X, 0), min(cw.X + cw.WIDTH, width), cw)
+            for y in range(top, bottom):
+                self.rows[y].append(span)
+            if cw.MENU:
+                self.menus[cw] = self._menu_spans()
+
+    @staticmethod
+    def _menu_spans():
+        spans = []
+        x = 0
+        for menu in Menu.ALL:
+            title_width = text_width(menu.title)
+            spans.append((x, x + title_width + 2, menu))
+            x += title_width + 2
+        return spans
+
+    def find(self, screen_x, screen_y, bstate):
+        '''
+        Returns the window under the pointer and the event to send it, or
+        (None, None).
+        '''
+        if not 0 <= screen_y < len(self.rows):
+            return None, None
+        for x0, x1, cw in self.rows[screen_y]:
+            if x0 <= screen_x < x1:
+                break
+        else:
+            return None, None
+        x, y = screen_x - cw.X, screen_y - cw.Y
+        if cw.BORDERED:
+            x, y = x - 1, y - 1
+        if cw.MENU:
+            y -= 1
+        if cw.PAD:
+            x, y = x + cw.PAD_X, y + cw.PAD_Y
+        menu = None
+        if y == -1 and cw in self.menus:
+            for x0, x1, title_menu in self.menus[cw]:
+                if x0 <= x < x1:
+                    menu = title_menu
+                    break
+        return cw, CursedMouseEvent(x, y, screen_x, screen_y, bstate,
+                                    menu=menu)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+'''
+cursed.ring
+
+A fixed size ring buffer, used for the scrollback of SCROLL windows.
+'''
+
+
+class CursedRing(object):
+    '''
+    Holds the last size items appended, dropping the oldest ones. Appending
+    and indexing both take constant time, unlike a deque which is slow to
+    index in the middle.
+
+    :param size: the most items to hold
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self._items = [None] * size
+        self._start = 0
+        self._len = 0
+
+    def append(self, item):
+        '''
+        Adds an item at the end, dropping the oldest item if the ring is
+        full.
+        '''
+        if not self.size:
+            return
+        if self._len < self.size:
+            self._items[(self._start + self._len) % self.size] = item
+            self._len += 1
+        else:
+            self._items[self._start] = item
+            self._start = (self._start + 1) % self.size
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def clear(self):
+        self._items = [None] * self.size
+        self._start = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('ring index out of range')
+        return self._items[(self._start + index) % self.size]
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self._items[(self._start + i) % self.size]
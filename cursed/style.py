@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+'''
+cursed.style
+
+Styles combine text attributes with a foreground and background color, and
+can be passed as the attr of any drawing call, like ``addstr``.
+A style is written as words like 'bold red on blue', and can be given a name
+with ``define_style``:
+::
+
+    from cursed import define_style
+
+    define_style('warning', 'bold yellow on red')
+
+    class Status(CursedWindow):
+        ...
+        @classmethod
+        def update(cls):
+            cls.addstr('disk almost full', 0, 0, attr='warning')
+
+Every style is parsed once, and the attribute integer it compiles to is
+cached, so drawing with a style costs the same as drawing with a plain curses
+attribute. A CursedStyle object can be kept and passed around as well.
+
+Color pairs are allocated the first time a combination of colors is drawn.
+When the terminal has no color pairs left, the pair used least recently is
+reused, so text still on screen in that pair changes colors.
+'''
+
+import curses
+import six
+from collections import OrderedDict
+from cursed.exceptions import CursedStyleError
+
+COLORS = {
+    'default': -1,
+    'black': curses.COLOR_BLACK,
+    'red': curses.COLOR_RED,
+    'green': curses.COLOR_GREEN,
+    'yellow': curses.COLOR_YELLOW,
+    'blue': curses.COLOR_BLUE,
+    'magenta': curses.COLOR_MAGENTA,
+    'cyan': curses.COLOR_CYAN,
+    'white': curses.COLOR_WHITE,
+}
+
+# Attributes only store 8 bits of pair number, whatever COLOR_PAIRS says
+MAX_PAIRS = 256
+
+# Styles given a name with define_style
+_STYLES = {}
+# Every spec drawn with so far, apart so a spec never shadows a name
+_SPECS = {}
+# Called by define_style, to drop anything built from the old styles
+_ON_DEFINE = []
+
+
+def _color(word):
+    if word in COLORS:
+        return COLORS[word]
+    if word.startswith('color'):
+        word = word[5:]
+    if word.isdigit():
+        return int(word)
+    return None
+
+
+def _parse(spec):
+    '''
+    Parses a spec like 'bold red on blue' into (attrs, fg, bg).
+    '''
+    attrs, fg, bg = 0, None, None
+    words = spec.lower().split()
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word == 'on':
+            i += 1
+            if i == len(words) or _color(words[i]) is None:
+                raise CursedStyleError('expected a color after "on" in {!r}'
+                                       .format(spec))
+            bg = _color(words[i])
+        elif _color(word) is not None:
+            if fg is not None:
+                raise CursedStyleError('more than one foreground color in '
+                                       '{!r}'.format(spec))
+            fg = _color(word)
+        elif hasattr(curses, 'A_' + word.upper()):
+            attrs |= getattr(curses, 'A_' + word.upper())
+        else:
+            raise CursedStyleError('unknown attribute or color {!r} in {!r}'
+                                   .format(word, spec))
+        i += 1
+    return attrs, fg, bg
+
+
+class CursedStyle(object):
+    '''
+    Text attributes and colors, parsed once from a spec like
+    'bold underline red on blue'.
+    Attributes are curses attribute names, like bold, dim, reverse or
+    underline. Colors are black, red, green, yellow, blue, magenta, cyan,
+    white, default, or a color number like 208 or color208.
+    The first color is the foreground, and the color after "on" the
+    background.
+
+    :param spec: the attributes and colors
+    '''
+
+    def __init__(self, spec=''):
+        self.spec = spec
+        self.attrs, self.fg, self.bg = _parse(spec)
+        self._colored = self.fg is not None or self.bg is not None
+        # The attribute with its color pair, good until a pair is reused
+        self._attr = self.attrs
+        self._generation = None
+        self._pair = None
+
+    def __repr__(self):
+        return 'CursedStyle({!r})'.format(self.spec)
+
+    def combine(self, other):
+        '''
+        Returns a style with the attributes of both styles, and the colors of
+        other where it has them, else the colors of this style.
+
+        :param other: the CursedStyle on top of this one
+        :return: a new CursedStyle
+        '''
+        style = CursedStyle()
+        style.spec = '{} + {}'.format(self.spec, other.spec)
+        style.attrs = self.attrs | other.attrs
+        style.fg = self.fg if other.fg is None else other.fg
+        style.bg = self.bg if other.bg is None else other.bg
+        style._colored = style.fg is not None or style.bg is not None
+        style._attr = style.attrs
+        return style
+
+    @property
+    def attr(self):
+        '''
+        The curses attribute integer of the style, with its color pair.
+        '''
+        if not self._colored:
+            return self._attr
+        if self._generation != _PAIRS.generation:
+            self._pair = _PAIRS.pair(self.fg, self.bg)
+            self._attr = self.attrs | self._pair[0]
+            self._generation = _PAIRS.generation
+        else:
+            # Mark the pair used, so it isn't the next one reused
+            self._pair[1] = True
+        return self._attr
+
+
+def define_style(name, spec):
+    '''
+    Gives a style a name, which can then be passed as the attr of any drawing
+    call. Defining a name again replaces the style.
+
+    :param name: the name of the style
+    :param spec: a spec like 'bold red on blue', or a CursedStyle
+    :return: the CursedStyle
+    '''
+    if not isinstance(spec, CursedStyle):
+        spec = CursedStyle(spec)
+    _STYLES[name] = spec
+    for func in _ON_DEFINE:
+        func()
+    return spec
+
+
+def get_style(name):
+    '''
+    Returns the style defined with name, or the style parsed from name if it
+    is a spec like 'bold red'.
+
+    :param name: the name or spec of the style
+    :return: the CursedStyle
+    '''
+    style = _STYLES.get(name)
+    if style is None:
+        style = _SPECS.get(name)
+        if style is None:
+            style = _SPECS[name] = CursedStyle(name)
+    return style
+
+
+def resolve(attr):
+    '''
+    Returns the curses attribute integer for a style, style name, spec or
+    attribute integer.
+    '''
+    if attr is None or isinstance(attr, six.integer_types):
+        return attr
+    if isinstance(attr, six.string_types):
+        attr = get_style(attr)
+    elif not isinstance(attr, CursedStyle):
+        raise CursedStyleError('expected an attribute, style name or '
+                               'CursedStyle, not {!r}'.format(attr))
+    return attr.attr
+
+
+class _ColorPairs(object):
+    '''
+    Allocates color pairs as they're needed, reusing the least recently used
+    pair once they run out.
+    Styles keep the attribute of their pair, and only ask for it again once
+    generation changes, when a pair is reused or the colors are restarted.
+    In between they only mark their pair used, and the pair reused is the
+    oldest one not used since it was last passed over, a second chance
+    approximation of LRU that costs drawing nothing but setting a flag.
+    '''
+
+    def __init__(self):
+        self.backend = None
+        self.limit = 0
+        self.generation = 0
+        # (fg, bg) to [attr, used], from the least recently used
+        self._pairs = OrderedDict()
+        self._numbers = {}
+
+    def start(self, backend):
+        self.backend = backend
+        self.limit = 0
+        if backend is not None:
+            # Pair 0 is the terminal's default colors and can't be changed
+            self.limit = min(backend.color_pairs, MAX_PAIRS) - 1
+        self._pairs.clear()
+        self._numbers.clear()
+        self.generation += 1
+
+    def pair(self, fg, bg):
+        '''
+        Returns the [attr, used] entry of the pair for fg and bg, allocating
+        it if it isn't one of the pairs in use.
+        '''
+        if self.limit <= 0:
+            return [0, False]
+        key = (fg, bg)
+        try:
+            entry = self._pairs.pop(key)
+        except KeyError:
+            entry = [self._allocate(key), False]
+        self._pairs[key] = entry
+        return entry
+
+    def _allocate(self, key):
+        if len(self._numbers) < self.limit:
+            number = len(self._numbers) + 1
+        else:
+            number = self._numbers.pop(self._evict())
+            self.generation += 1
+        fg, bg = key
+        self.backend.init_pair(number, -1 if fg is None else fg,
+                               -1 if bg is None else bg)
+        self._numbers[key] = number
+        return self.backend.color_pair(number)
+
+    def _evict(self):
+        '''
+        Removes and returns the key of the oldest pair not used since it was
+        last passed over, moving the used ones it passes to the end.
+        '''
+        while True:
+            key, entry = self._pairs.popitem(last=False)
+            if not entry[1]:
+                return key
+            entry[1] = False
+            self._pairs[key] = entry
+
+
+_PAIRS = _ColorPairs()
+
+
+def _start_colors(backend):
+    '''
+    Starts allocating color pairs on the backend, or stops if it is None.
+    '''
+    _PAIRS.start(backend)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+'''
+cursed.tail
+
+A window following a growing file, like ``tail -f``.
+
+The file is read from where the last read stopped, in large chunks on a
+gevent timer, so only new lines are ever read. Rotated and truncated files
+are detected and read again from their start.
+'''
+
+import os
+import time
+import gevent
+
+from cursed.window import CursedWindow
+from cursed.ring import CursedRing
+
+
+class CursedTail(CursedWindow):
+    '''
+    A CursedWindow showing the last lines of a file as it grows.
+
+    Set PATH to follow a file when the window starts, or call ``follow``
+    later. Declare X, Y, WIDTH and HEIGHT like any other window:
+    ::
+
+        class LogTail(CursedTail):
+            WIDTH, HEIGHT = 'max', 'max'
+            PATH = '/var/log/syslog'
+
+    The file is checked every POLL_INTERVAL seconds, default 0.25, and read
+    READ_SIZE bytes at a time, default 64KB, yielding to the other windows
+    between reads. The last LINES lines are kept, default 10000.
+    A burst of lines is drawn at most once every RENDER_INTERVAL seconds,
+    default 0.1.
+
+    The arrow keys and page up and down scroll back through the kept lines,
+    and end follows the file again. To handle other keys, override
+    ``update`` and pass the keys it doesn't handle to ``handle_keys``.
+    '''
+
+    PATH = None
+    ENCODING = 'utf-8'
+    TAB_WIDTH = 8
+    POLL_INTERVAL = 0.25
+    READ_SIZE = 1 << 16
+    LINES = 10000
+    RENDER_INTERVAL = 0.1
+
+    _CT_FILE = None
+    _CT_INODE = None
+    _CT_PARTIAL = b''
+    _CT_LINES = CursedRing(0)
+    _CT_BACK = 0
+    _CT_THREAD = None
+    _CT_RENDER = None
+    _CT_RENDERED = 0
+
+    @classmethod
+    def follow(cls, path):
+        '''
+        Starts following the file at path, showing its last lines. The file
+        doesn't need to exist yet.
+
+        :param path: the path to the file
+        '''
+        cls.close()
+        cls.PATH = path
+        cls._CT_LINES = CursedRing(cls.LINES)
+        cls._CT_BACK = 0
+        cls._CT_THREAD = gevent.spawn(cls._ct_poll_loop)
+
+    @classmethod
+    def close(cls):
+        '''
+        Stops following the file and closes it.
+        '''
+        for thread in (cls._CT_THREAD, cls._CT_RENDER):
+            if thread is not None:
+                thread.kill()
+        cls._CT_THREAD = cls._CT_RENDER = None
+        cls._ct_close_file()
+
+    @classmethod
+    def _ct_close_file(cls):
+        if cls._CT_FILE is not None:
+            cls._CT_FILE.close()
+        cls._CT_FILE, cls._CT_INODE = None, None
+        cls._CT_PARTIAL = b''
+
+    @classmethod
+    def _ct_open(cls, tail):
+        '''
+        Opens the file, starting near the end if tail is True so that only
+        about one chunk of its last lines is read.
+        '''
+        try:
+            f = open(cls.PATH, 'rb')
+        except (IOError, OSError):
+            return
+        stat = os.fstat(f.fileno())
+        cls._CT_FILE, cls._CT_INODE = f, stat.st_ino
+        cls._CT_PARTIAL = b''
+        if tail and stat.st_size > cls.READ_SIZE:
+            f.seek(stat.st_size - cls.READ_SIZE)
+            # Skip the line cut in half by seeking
+            f.readline()
+
+    @classmethod
+    def _ct_poll_loop(cls):
+        cls._ct_open(tail=True)
+        while True:
+            cls._ct_poll()
+            gevent.sleep(cls.POLL_INTERVAL)
+
+    @classmethod
+    def _ct_poll(cls):
+        '''
+        Reads what was added to the file, then reopens it if it was rotated
+        or truncated.
+        '''
+        if cls._CT_FILE is None:
+            cls._ct_open(tail=False)
+            if cls._CT_FILE is None:
+                return
+        cls._ct_read()
+        try:
+            stat = os.stat(cls.PATH)
+        except OSError:
+            # Rotated away and not created again yet
+            return
+        if stat.st_ino != cls._CT_INODE:
+            cls._ct_close_file()
+            cls._ct_open(tail=False)
+            cls._ct_read()
+        elif stat.st_size < cls._CT_FILE.tell():
+            cls._CT_FILE.seek(0)
+            cls._CT_PARTIAL = b''
+            cls._ct_read()
+
+    @classmethod
+    def _ct_read(cls):
+        '''
+        Reads to the end of the file in READ_SIZE chunks, keeping the complete
+        lines and yielding between chunks.
+        '''
+        while True:
+            data = cls._CT_FILE.read(cls.READ_SIZE)
+            if not data:
+                return
+            lines = (cls._CT_PARTIAL + data).split(b'\n')
+            cls._CT_PARTIAL = lines.pop()
+            cls._ct_add_lines(lines)
+            gevent.sleep(0)
+
+    @classmethod
+    def _ct_add_lines(cls, lines):
+        if not lines:
+            return
+        ring = cls._CT_LINES
+        for line in lines:
+            line = line.decode(cls.ENCODING, 'replace')
+            ring.append(line.rstrip('\r').expandtabs(cls.TAB_WIDTH))
+        if cls._CT_BACK:
+            # Stay on the same lines while scrolled back
+            cls._CT_BACK = min(cls._CT_BACK + len(lines), cls._ct_max_back())
+        cls._ct_request_render()
+
+    @classmethod
+    def _ct_request_render(cls):
+        '''
+        Triggers a render, at most once every RENDER_INTERVAL seconds.
+        '''
+        if cls._CT_RENDER is not None:
+            return
+        delay = cls._CT_RENDERED + cls.RENDER_INTERVAL - time.time()
+        cls._CT_RENDER = gevent.spawn_later(max(delay, 0), cls.trigger,
+                                            'render')
+
+    @classmethod
+    def lines(cls):
+        '''
+        Returns the lines kept so far, oldest first.
+        '''
+        return cls._CT_LINES[:]
+
+    @classmethod
+    def following(cls):
+        '''
+        Returns True if the view follows the end of the file, rather than
+        being scrolled back.
+        '''
+        return cls._CT_BACK == 0
+
+    @classmethod
+    def _ct_max_back(cls):
+        return max(len(cls._CT_LINES) - cls._cw_area()[3], 0)
+
+    @classmethod
+    def render(cls):
+        '''
+        Draws the lines in view.
+        '''
+        cls._CT_RENDER = None
+        cls._CT_RENDERED = time.time()
+        rows = cls._cw_area()[3]
+        ring = cls._CT_LINES
+        first = max(len(ring) - rows - cls._CT_BACK, 0)
+        cls._cw_draw_rows(ring[first:first + rows])
+        cls.refresh()
+
+    @classmethod
+    def scroll(cls, lines):
+        '''
+        Scrolls down by lines towards the end of the file, or back if it is
+        negative.
+        '''
+        cls._CT_BACK = max(min(cls._CT_BACK - lines, cls._ct_max_back()), 0)
+
+    @classmethod
+    def handle_keys(cls, keys):
+        '''
+        Scrolls the view for the navigation keys in keys, as returned by
+        ``getkeys(coalesce=True)``.
+
+        :param keys: list of (keycode, count) pairs
+        :return: list of the pairs that weren't navigation keys
+        '''
+        return cls._cw_nav_keys(
+            keys, cls.scroll, lambda: cls.scroll(-len(cls._CT_LINES)),
+            lambda: cls.scroll(len(cls._CT_LINES)),
+        )
+
+    @classmethod
+    def update(cls):
+        '''
+        Sleeps until keys are pressed, handles them and draws the view.
+        New lines are drawn as they're read, without waiting for update.
+        '''
+        keys = cls.getkeys(coalesce=True, timeout=None)
+        if keys:
+            cls.handle_keys(keys)
+            cls.render()
+
+    @classmethod
+    def _cw_setup_run(cls, app, window):
+        super(CursedTail, cls)._cw_setup_run(app, window)
+        if cls.PATH is not None and cls._CT_THREAD is None:
+            cls.follow(cls.PATH)
+
+    @classmethod
+    def _cw_run(cls, app, window):
+        try:
+            super(CursedTail, cls)._cw_run(app, window)
+        finally:
+            cls.close()
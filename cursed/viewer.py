@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+'''
+cursed.viewer
+
+A window for paging through text files of any size.
+
+The file is memory-mapped rather than read, and the offsets of its lines are
+indexed in the background, one chunk at a time, so the first page shows up
+right away even for files of many gigabytes. Only the lines in view are ever
+decoded and drawn.
+'''
+
+import os
+import mmap
+from bisect import bisect_right
+import gevent
+
+from cursed.window import CursedWindow
+
+
+class CursedViewer(CursedWindow):
+    '''
+    A CursedWindow showing a text file, scrolled with the arrow keys, page up
+    and page down, and home and end.
+
+    Set PATH to open a file when the window starts, or call ``open`` later.
+    Declare X, Y, WIDTH and HEIGHT like any other window:
+    ::
+
+        class LogViewer(CursedViewer):
+            WIDTH, HEIGHT = 'max', 'max'
+            PATH = '/var/log/syslog'
+
+    To handle other keys, override ``update`` and pass the keys it doesn't
+    handle to ``handle_keys``.
+
+    The index keeps one checkpoint per INDEX_CHUNK bytes, default 64KB, so it
+    stays small however large the file is. Lines are decoded with ENCODING,
+    default utf-8, and tabs are expanded to TAB_WIDTH spaces.
+    '''
+
+    PATH = None
+    ENCODING = 'utf-8'
+    TAB_WIDTH = 8
+    INDEX_CHUNK = 1 << 16
+
+    TOP = 0
+    LEFT = 0
+
+    _CV_FILE = None
+    _CV_MMAP = None
+    _CV_SIZE = 0
+    _CV_LINES = ()
+    _CV_OFFSETS = ()
+    _CV_COUNT = 0
+    _CV_DONE = True
+    _CV_THREAD = None
+    _CV_CURSOR = None
+
+    @classmethod
+    def open(cls, path):
+        '''
+        Opens the file at path, showing its first line and starting to index
+        it in the background.
+
+        :param path: the path to the text file
+        '''
+        cls.close()
+        cls.PATH = path
+        cls._CV_FILE = open(path, 'rb')
+        cls._CV_SIZE = os.fstat(cls._CV_FILE.fileno()).st_size
+        # Empty files can't be mapped, and have nothing to show anyway
+        if cls._CV_SIZE:
+            cls._CV_MMAP = mmap.mmap(cls._CV_FILE.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        cls._CV_LINES = [0]
+        cls._CV_OFFSETS = [0]
+        cls._CV_COUNT = 0
+        cls._CV_DONE = False
+        cls._CV_CURSOR = None
+        cls.TOP, cls.LEFT = 0, 0
+        cls._CV_THREAD = gevent.spawn(cls._cv_index)
+
+    @classmethod
+    def close(cls):
+        '''
+        Stops indexing and closes the file.
+        '''
+        if cls._CV_THREAD is not None:
+            cls._CV_THREAD.kill()
+            cls._CV_THREAD = None
+        if cls._CV_MMAP is not None:
+            cls._CV_MMAP.close()
+            cls._CV_MMAP = None
+        if cls._CV_FILE is not None:
+            cls._CV_FILE.close()
+            cls._CV_FILE = None
+        cls._CV_SIZE = 0
+        cls._CV_LINES, cls._CV_OFFSETS = (), ()
+        cls._CV_COUNT = 0
+        cls._CV_DONE = True
+
+    @classmethod
+    def _cv_index(cls):
+        '''
+        Counts the lines of the file a chunk at a time, recording the line
+        number and offset at the start of each chunk, and yielding to the
+        other greenlets in between.
+        '''
+        mm, size = cls._CV_MMAP, cls._CV_SIZE
+        pos = 0
+        while pos < size:
+            end = mm.find(b'\n', min(pos + cls.INDEX_CHUNK, size) - 1)
+            end = size if end == -1 else end + 1
+            cls._CV_COUNT += mm[pos:end].count(b'\n')
+            pos = end
+            if pos < size:
+                cls._CV_LINES.append(cls._CV_COUNT)
+                cls._CV_OFFSETS.append(pos)
+            # Draw the lines as soon as they're known, if they're in view
+            if cls._CV_COUNT < cls.TOP + cls._cw_area()[3]:
+                cls.trigger('render')
+            gevent.sleep(0)
+        if size and mm[size - 1:size] != b'\n':
+            # The last line has no newline at the end
+            cls._CV_COUNT += 1
+        cls._CV_DONE = True
+        cls.trigger('render')
+
+    @classmethod
+    def line_count(cls):
+        '''
+        Returns the number of lines indexed so far, which is every line once
+        ``indexed`` returns True.
+        '''
+        return cls._CV_COUNT
+
+    @classmethod
+    def indexed(cls):
+        '''
+        Returns True once the whole file has been indexed.
+        '''
+        return cls._CV_DONE
+
+    @classmethod
+    def _cv_offset(cls, line):
+        '''
+        Returns the byte offset where line starts, searching forward from the
+        nearest checkpoint, or from the last line found if that's closer.
+        '''
+        i = bisect_right(cls._CV_LINES, line) - 1
+        start, offset = cls._CV_LINES[i], cls._CV_OFFSETS[i]
+        if cls._CV_CURSOR is not None and start <= cls._CV_CURSOR[0] <= line:
+            start, offset = cls._CV_CURSOR
+        mm = cls._CV_MMAP
+        for i in range(line - start):
+            offset = mm.find(b'\n', offset) + 1
+        cls._CV_CURSOR = (line, offset)
+        return offset
+
+    @classmethod
+    def get_lines(cls, start, count):
+        '''
+        Returns up to count decoded lines, starting at line number start.
+
+        :param start: the first line, from 0
+        :param count: the number of lines
+        :return: list of strings, without their line endings
+        '''
+        count = min(count, cls.line_count() - start)
+        if cls._CV_MMAP is None or start < 0 or count <= 0:
+            return []
+        mm = cls._CV_MMAP
+        offset = cls._cv_offset(start)
+        lines = []
+        for i in range(count):
+            end = mm.find(b'\n', offset)
+            end = cls._CV_SIZE if end == -1 else end
+            line = mm[offset:end].decode(cls.ENCODING, 'replace')
+            lines.append(line.rstrip('\r').expandtabs(cls.TAB_WIDTH))
+            offset = end + 1
+        return lines
+
+    @classmethod
+    def render(cls):
+        '''
+        Draws the lines in view.
+        '''
+        lines = cls.get_lines(cls.TOP, cls._cw_area()[3])
+        cls._cw_draw_rows([line[cls.LEFT:] for line in lines])
+        cls.refresh()
+
+    @classmethod
+    def goto(cls, line):
+        '''
+        Scrolls so that line is at the top of the window, as far as the lines
+        indexed so far allow.
+
+        :param line: the line number, from 0
+        '''
+        last = max(cls.line_count() - cls._cw_area()[3], 0)
+        cls.TOP = max(min(line, last), 0)
+
+    @classmethod
+    def scroll(cls, lines):
+        '''
+        Scrolls down by lines, or up if it is negative.
+        '''
+        cls.goto(cls.TOP + lines)
+
+    @classmethod
+    def pan(cls, cols):
+        '''
+        Scrolls right by cols, or left if it is negative.
+        '''
+        cls.LEFT = max(cls.LEFT + cols, 0)
+
+    @classmethod
+    def handle_keys(cls, keys):
+        '''
+        Scrolls the view for the navigation keys in keys, as returned by
+        ``getkeys(coalesce=True)``.
+
+        :param keys: list of (keycode, count) pairs
+        :return: list of the pairs that weren't navigation keys
+        '''
+        return cls._cw_nav_keys(
+            keys, cls.scroll, lambda: cls.goto(0),
+            lambda: cls.goto(cls.line_count()), pan=cls.pan,
+        )
+
+    @classmethod
+    def update(cls):
+        '''
+        Draws the view, then sleeps until keys are pressed and handles them.
+        '''
+        cls.render()
+        cls.handle_keys(cls.getkeys(coalesce=True, timeout=None))
+
+    @classmethod
+    def _cw_setup_run(cls, app, window):
+        super(CursedViewer, cls)._cw_setup_run(app, window)
+        if cls.PATH is not None and cls._CV_FILE is None:
+            cls.open(cls.PATH)
+
+    @classmethod
+    def _cw_run(cls, app, window):
+        try:
+            super(CursedViewer, cls)._cw_run(app, window)
+        finally:
+            cls.close()
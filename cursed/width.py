@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+cursed.width
+
+The width of text on the terminal, in cells rather than characters.
+CJK characters and most emoji take two cells, and combining marks and other
+zero width characters take none, so ``len`` is wrong for them:
+::
+
+    >>> width(u'你好')
+    4
+    >>> clip(u'你好!', 3)
+    u'你'
+
+The width of each character is looked up in unicodedata once and kept in a
+table, and strings of only ASCII characters skip the table altogether.
+'''
+
+import unicodedata
+import six
+
+# Widths of the characters seen so far, filled as they're first met
+_WIDTHS = {}
+
+if hasattr(str, 'isascii'):
+    _is_ascii = str.isascii
+else:
+    def _is_ascii(s):
+        try:
+            s.encode('ascii')
+        except UnicodeError:
+            return False
+        return True
+
+
+def char_width(ch):
+    '''
+    Returns the number of cells the character takes: 0, 1 or 2.
+    '''
+    try:
+        return _WIDTHS[ch]
+    except KeyError:
+        pass
+    if unicodedata.combining(ch) or unicodedata.category(ch) in (
+        'Mn', 'Me', 'Cf', 'Cc',
+    ):
+        cells = 0
+    elif unicodedata.east_asian_width(ch) in ('W', 'F'):
+        cells = 2
+    else:
+        cells = 1
+    _WIDTHS[ch] = cells
+    return cells
+
+
+def width(s):
+    '''
+    Returns the number of cells the string takes.
+    '''
+    if not isinstance(s, six.text_type) or _is_ascii(s):
+        return len(s)
+    return sum(char_width(ch) for ch in s)
+
+
+def clip(s, cells):
+    '''
+    Returns the longest start of the string that fits in cells, never cutting
+    a wide character in half. Zero width characters after the last character
+    that fits are kept with it.
+
+    :param s: the string
+    :param cells: the most cells it can take
+    :return: the clipped string
+    '''
+    if not isinstance(s, six.text_type) or _is_ascii(s):
+        return s[:max(cells, 0)]
+    used = 0
+    for i, ch in enumerate(s):
+        used += char_width(ch)
+        if used > cells:
+            return s[:i]
+    return s
+
+
+def pad(s, cells):
+    '''
+    Returns the string clipped or padded with spaces to exactly cells wide,
+    like ``ljust`` but in cells.
+
+    :param s: the string
+    :param cells: the width to clip or pad it to
+    :return: the string, cells wide
+    '''
+    if not isinstance(s, six.text_type) or _is_ascii(s):
+        return s[:max(cells, 0)].ljust(cells)
+    s = clip(s, cells)
+    return s + u' ' * (cells - width(s))
+
+
+def wrap(s, cells):
+    '''
+    Splits the string into lines of at most cells each, breaking at the last
+    space that fits if there is one.
+
+    :param s: the string, on a single line
+    :param cells: the most cells each line can take
+    :return: list of lines
+    '''
+    lines = []
+    while width(s) > cells:
+        line = clip(s, cells)
+        if not line:
+            # Not even one character fits
+            return lines
+        space = line.rfind(u' ')
+        if space > 0:
+            line = line[:space]
+        lines.append(line)
+        s = s[len(line):].lstrip(u' ')
+    lines.append(s)
+    return lines
@@ -6,12 +6,20 @@ This contains the core logic used by cursed to create the window and offer the
 ncurses interface to display everything.
 '''
 
+import time
 import curses
+import functools
 import gevent
 import six
+from gevent.queue import Full
+from gevent.event import AsyncResult
 from cursed.exceptions import CursedSizeError, CursedCallbackError
 from cursed.meta import CursedWindowClass
 from cursed.menu import _Menu as Menu
+from cursed.style import CursedStyle, resolve as resolve_style
+from cursed.markup import parse as parse_markup
+from cursed.width import width as text_width, clip, pad as pad_text
+from cursed.width import char_width
 
 
 @six.add_metaclass(CursedWindowClass)
@@ -25,6 +33,50 @@ class CursedWindow(object):
     Each function in a class derived from CursedWindow should be a classmethod,
     since no instances of the class will be created. The code will run as the
     single class, like a singleton.
+
+    By default ``update`` is looped upon as fast as possible. Set
+    UPDATE_INTERVAL to a number of seconds to run it at most that often, and
+    UPDATE_ON_EVENT to True to also run it whenever a key is pressed or a
+    callback is triggered. Between updates the window's greenlet sleeps, and
+    triggered callbacks are still handled as soon as they arrive.
+
+    Set VIRTUAL_PAD to True for a pad too large to allocate, like a map of
+    100000 by 100000. Its content is split into tiles of TILE_WIDTH by
+    TILE_HEIGHT, default 64 by 16, which come from a ``tile`` classmethod
+    and from text written with ``pad_write``. Only the tiles in view are
+    built, and the last TILE_CACHE_SIZE of them are kept, default 64.
+    ``pad_move`` and ``refresh`` work like for any pad.
+
+    SCROLL windows can keep the last SCROLLBACK lines that scrolled off the
+    top, default none. ``history_up`` and ``history_down`` page back through
+    them while new lines keep arriving, and ``history_end`` goes back to
+    the live view.
+
+    Triggered callbacks are queued in EVENTS, which has no limit unless
+    EVENT_QUEUE_SIZE is set. EVENT_POLICY decides what happens when it is
+    full: 'block' makes the triggering window wait, the default, or raises
+    a CursedCallbackError in a window triggering itself, 'drop-oldest' drops
+    the oldest callback, and 'coalesce' also keeps only the latest call of
+    each callback name, see ``cursed.events``. ``quit`` always skips ahead.
+
+    Keys go to the window with focus (see ``focus``) and to windows that set
+    WANTS_KEYS to True. Mouse events go to the window under the pointer. At
+    most KEY_QUEUE_SIZE unread keys and mouse events are kept, default 1024,
+    after which the oldest are dropped.
+
+    The attr of drawing calls like ``addstr`` is a curses attribute, a style
+    like 'bold red on blue', or a style name given with ``define_style``.
+    Styles are compiled once, see ``cursed.style``. ``write_markup`` draws
+    text with inline styles, like '[bold]CPU[/] 93%'.
+
+    The window keeps track of its cursor itself rather than asking curses
+    on every call. After drawing on WINDOW directly instead of through the
+    window's methods, call ``move`` before drawing at the cursor again.
+
+    When the terminal is resized, windows sized 'max' grow or shrink to fit,
+    windows that no longer fit are cut off or hidden, and every window that
+    changed is redrawn. Define a ``resize`` classmethod to redraw its contents
+    right away, since it is triggered like any callback.
     '''
 
     _CW_WINDOW_SWAP_FUNCS = (
@@ -33,11 +85,17 @@ class CursedWindow(object):
     _CW_SCREEN_SWAP_FUNCS = (
     )
     _CW_WINDOW_FUNCS = (
-        'clear', 'deleteln', 'erase', 'insertln', 'border',
         'nodelay', 'notimeout', 'clearok', 'is_linetouched', 'is_wintouched',
     )
+    _CW_WINDOW_DRAW_FUNCS = (
+        'clear', 'deleteln', 'erase', 'insertln', 'border',
+    )
     _CW_SCREEN_FUNCS = (
     )
+    _CW_NAV_KEYS = frozenset((
+        curses.KEY_UP, curses.KEY_DOWN, curses.KEY_LEFT, curses.KEY_RIGHT,
+        curses.KEY_PPAGE, curses.KEY_NPAGE, curses.KEY_HOME, curses.KEY_END,
+    ))
 
     @classmethod
     def sleep(cls, seconds=0):
@@ -60,30 +118,115 @@ class CursedWindow(object):
         return gevent.sleep(seconds)
 
     @classmethod
-    def getch(cls):
+    def getch(cls, timeout=0):
         '''
         Get the integer value for the keypress, such as 27 for escape.
 
+        By default this returns None right away if no key was pressed. With a
+        timeout it sleeps the window's greenlet until a key arrives, for at
+        most timeout seconds, or forever if timeout is None. It also returns
+        None early if a callback is triggered for the window or a mouse event
+        arrives, so it can be handled.
+
+        :param timeout: seconds to wait for a key, default 0
         :return: integer keycode of keypress
         '''
-        if cls.KEY_EVENTS.empty():
+        if not cls._cw_wait_key(timeout):
             return None
-        return cls.KEY_EVENTS.get()
+        return cls._cw_take_key()
 
     @classmethod
-    def getkey(cls):
+    def getkey(cls, timeout=0):
         '''
         Get the key that was pressed, or None.
         This is useful to simply check what key was pressed on the keyboard,
         ignoring special keys like the arrow keys.
 
+        :param timeout: seconds to wait for a key, like in ``getch``
         :return: character specifying key pressed, like 'a' or 'C'
         '''
-        if cls.KEY_EVENTS.empty():
+        if not cls._cw_wait_key(timeout):
             return None
-        nchar = cls.KEY_EVENTS.get()
+        nchar = cls._cw_take_key()
         return chr(nchar)
 
+    @classmethod
+    def getkeys(cls, coalesce=False, timeout=0):
+        '''
+        Get every pending keypress at once, so a window can handle a burst of
+        keys, like a held down arrow key, with a single redraw.
+
+        With coalesce, runs of the same navigation key (arrows, page up and
+        down, home and end) are merged into one (keycode, count) pair.
+        Example:
+        ::
+
+            for key, count in cls.getkeys(coalesce=True):
+                if key == curses.KEY_DOWN:
+                    cls.PAD_Y += count
+
+        :param coalesce: return (keycode, count) pairs instead of keycodes
+        :param timeout: seconds to wait for a key, like in ``getch``
+        :return: list of integer keycodes, or of (keycode, count) pairs
+        '''
+        if not cls._cw_wait_key(timeout):
+            return []
+        keys = []
+        while not cls.KEY_EVENTS.empty():
+            keys.append(cls.KEY_EVENTS.get_nowait())
+        if not coalesce:
+            return keys
+        runs = []
+        for key in keys:
+            if runs and runs[-1][0] == key and key in cls._CW_NAV_KEYS:
+                runs[-1] = (key, runs[-1][1] + 1)
+            else:
+                runs.append((key, 1))
+        return runs
+
+    @classmethod
+    def _cw_wait_key(cls, timeout):
+        '''
+        Sleeps until a key is pending, returning False if timeout ran out or a
+        callback or mouse event arrived first.
+        A mouse event only cuts the wait short once, so a window that doesn't
+        read its mouse events still sleeps until a key.
+        '''
+        if timeout == 0:
+            return not cls.KEY_EVENTS.empty()
+        if timeout is not None:
+            deadline = time.time() + timeout
+        while cls.KEY_EVENTS.empty():
+            mouse = cls.MOUSE_EVENTS[-1] if cls.MOUSE_EVENTS else None
+            if mouse is cls._CW_MOUSE_SEEN[0]:
+                mouse = None
+            if not cls.EVENTS.empty() or mouse is not None or not cls.RUNNING:
+                if mouse is not None:
+                    cls._CW_MOUSE_SEEN[0] = mouse
+                # Leave the window awake so the run loop handles the event
+                cls._cw_wake()
+                return False
+            remaining = None
+            if timeout is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+            cls._CW_WAKE.wait(remaining)
+            cls._CW_WAKE.clear()
+        return True
+
+    @classmethod
+    def _cw_take_key(cls):
+        '''
+        Takes the next key, waking the window again if more are queued, since
+        waiting for a key clears the wake up the run loop relies on to update
+        an UPDATE_ON_EVENT window for the rest.
+        '''
+        key = cls.KEY_EVENTS.get_nowait()
+        if not cls.KEY_EVENTS.empty():
+            cls._cw_wake()
+        return key
+
     @classmethod
     def addch(cls, c, x=None, y=None, attr=None):
         '''
@@ -98,6 +241,8 @@ class CursedWindow(object):
         x, y = cls._fix_xy(x, y)
         if isinstance(c, int):
             c = chr(c)
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
         if attr is None:
             return cls.WINDOW.addch(y, x, c)
         else:
@@ -112,6 +257,8 @@ class CursedWindow(object):
         :param y: optional y value
         '''
         x, y = cls._fix_xy(x, y)
+        cls._CW_CURSOR[0] = (y, x)
+        cls._CW_DIRTY = True
         return cls.WINDOW.delch(y, x)
 
     @classmethod
@@ -131,13 +278,8 @@ class CursedWindow(object):
 
         :return: (x, y)
         '''
-        y, x = cls.WINDOW.getyx()
-        if cls.BORDERED:
-            x -= 1
-            y -= 1
-        if cls.MENU:
-            y -= 1
-        return x, y
+        y, x = cls._cw_cursor()
+        return x - cls._CW_OX, y - cls._CW_OY
 
     @classmethod
     def inch(cls, x=None, y=None):
@@ -150,6 +292,7 @@ class CursedWindow(object):
         :return: (character, attributes)
         '''
         x, y = cls._fix_xy(x, y)
+        cls._CW_CURSOR[0] = (y, x)
         ret = cls.WINDOW.inch(y, x)
         char = 0xf & ret
         attrs = 0xf0 & ret
@@ -167,6 +310,8 @@ class CursedWindow(object):
         '''
         x, y = cls._fix_xy(x, y)
         attr = cls._fix_attr(attr)
+        cls._CW_CURSOR[0] = (y, x)
+        cls._CW_DIRTY = True
         if attr is None:
             return cls.WINDOW.insch(y, x, ch)
         else:
@@ -184,6 +329,7 @@ class CursedWindow(object):
         :return: string at position
         '''
         x, y = cls._fix_xy(x, y)
+        cls._CW_CURSOR[0] = (y, x)
         if n is None:
             return cls.WINDOW.instr(y, x)
         else:
@@ -202,6 +348,8 @@ class CursedWindow(object):
         '''
         x, y = cls._fix_xy(x, y)
         attr = cls._fix_attr(attr)
+        cls._CW_CURSOR[0] = (y, x)
+        cls._CW_DIRTY = True
         if attr is None:
             return cls.WINDOW.insstr(y, x, s)
         else:
@@ -210,23 +358,27 @@ class CursedWindow(object):
     @classmethod
     def insnstr(cls, s, x=None, y=None, n=None, attr=None):
         '''
-        Insert a string at cursor or specified position, at most n characters.
+        Insert a string at cursor or specified position, at most n cells wide.
         Cursor is not moved and characters to the right are shifted right.
-        If n is zero, all characters are inserted.
+        If n is zero or negative, all characters are inserted.
 
         :param s: the string
         :param x: optional x value
         :param y: optional y value
-        :param n: max characters to insert (0 is all)
+        :param n: max cells to insert (0 or less is all)
         :param attr: optional attributes
         '''
         x, y = cls._fix_xy(x, y)
         attr = cls._fix_attr(attr)
         n = n if n is not None else cls.WIDTH
+        if n > 0:
+            s = clip(s, n)
+        cls._CW_CURSOR[0] = (y, x)
+        cls._CW_DIRTY = True
         if attr is None:
-            return cls.WINDOW.insnstr(y, x, s, n)
+            return cls.WINDOW.insstr(y, x, s)
         else:
-            return cls.WINDOW.insnstr(y, x, s, n, attr)
+            return cls.WINDOW.insstr(y, x, s, attr)
 
     @classmethod
     def nextline(cls):
@@ -238,54 +390,209 @@ class CursedWindow(object):
         x, y = cls._fix_xy(x, y)
         if y + 1 == cls.HEIGHT:
             if cls.SCROLL:
+                cls._CW_DIRTY = True
+                if cls.SCROLLBACK:
+                    cls._cw_save_line()
                 cls.WINDOW.scroll()
+                cls._CW_CURSOR[0] = (y, 0)
                 cls.WINDOW.move(y, 0)
             else:
                 raise CursedSizeError('Window %s reached height at %d' % (
                     cls.__name__, y + 1))
         else:
+            cls._CW_CURSOR[0] = (y + 1, x)
             cls.WINDOW.move(y + 1, x)
 
+    @classmethod
+    def _cw_row(cls, y):
+        '''
+        Returns the text of row y, leaving the cursor where it was.
+        '''
+        cursor = cls._cw_cursor()
+        line = cls.WINDOW.instr(y, 0, cls.WIDTH)
+        cls.WINDOW.move(*cursor)
+        return line.decode('utf-8', 'replace').rstrip()
+
+    @classmethod
+    def _cw_save_line(cls):
+        '''
+        Keeps the top line, which is about to scroll off, in the scrollback.
+        '''
+        cls._CW_SCROLLBACK.append(cls._cw_row(0))
+        if cls._CW_HISTORY_POS is not None:
+            # Stay on the same lines while paging back through history
+            cls._CW_HISTORY_POS = min(cls._CW_HISTORY_POS + 1,
+                                      len(cls._CW_SCROLLBACK))
+            cls._CW_HISTORY_STALE = True
+
+    @classmethod
+    def in_history(cls):
+        '''
+        Returns True if the window is showing its scrollback instead of its
+        live contents.
+        '''
+        return cls._CW_HISTORY_POS is not None
+
+    @classmethod
+    def history_up(cls, lines=None):
+        '''
+        Pages back through the scrollback of a SCROLL window.
+
+        :param lines: lines to go back, default the height of the window
+        '''
+        lines = cls.HEIGHT if lines is None else lines
+        pos = min((cls._CW_HISTORY_POS or 0) + lines,
+                  len(cls._CW_SCROLLBACK))
+        cls._cw_set_history(pos or None)
+
+    @classmethod
+    def history_down(cls, lines=None):
+        '''
+        Pages forward through the scrollback, back to the live view at the
+        end.
+
+        :param lines: lines to go forward, default the height of the window
+        '''
+        lines = cls.HEIGHT if lines is None else lines
+        pos = (cls._CW_HISTORY_POS or 0) - lines
+        cls._cw_set_history(pos if pos > 0 else None)
+
+    @classmethod
+    def history_end(cls):
+        '''
+        Leaves the scrollback and shows the live contents of the window.
+        '''
+        cls._cw_set_history(None)
+
+    @classmethod
+    def _cw_set_history(cls, pos):
+        if pos == cls._CW_HISTORY_POS:
+            return
+        cls._CW_HISTORY_POS = pos
+        cls._CW_HISTORY_STALE = True
+        cls._CW_DIRTY = True
+        cls.refresh()
+
+    @classmethod
+    def _cw_render_history(cls):
+        '''
+        Draws the lines in view of the scrollback onto a pad shown over the
+        window. Only the visible lines are read from the ring, and lines below
+        the scrollback come from the live window.
+        '''
+        cls._CW_HISTORY_STALE = False
+        pad = cls._CW_HISTORY_PAD
+        if pad is None or pad.getmaxyx() != (cls.HEIGHT, cls.WIDTH):
+            pad = cls.APP.backend.newpad(cls.HEIGHT, cls.WIDTH)
+            cls._CW_HISTORY_PAD = pad
+        pad.erase()
+        ring = cls._CW_SCROLLBACK
+        first = len(ring) - cls._CW_HISTORY_POS
+        for y in range(cls.HEIGHT):
+            i = first + y
+            line = ring[i] if i < len(ring) else cls._cw_row(i - len(ring))
+            _draw(pad.addstr, y, 0, clip(line, cls.WIDTH))
+
     @classmethod
     def write(cls, msg, x=None, y=None):
         '''
         Writes a msg to the screen, with optional x and y values.
-        If newlines are present, it goes to the next line.
+        If newlines are present, it goes to the next line. Lines are clipped
+        to the window by their width in cells, so wide characters like CJK
+        and emoji fit, see ``cursed.width``.
 
         :param msg: the message to print
         :param x: optional x value
         :param y: optional y value
         '''
         x, y = cls._fix_xy(x, y)
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
         for i, line in enumerate(msg.splitlines()):
             if y == cls.HEIGHT - 1:
                 break
-            if len(line) + x >= cls.WIDTH:
-                line = line[:cls.WIDTH - x - 1]
-            cls.WINDOW.addstr(y, x, line)
+            cls.WINDOW.addstr(y, x, clip(line, cls.WIDTH - x - 1))
+            y += 1
+
+    @classmethod
+    def write_markup(cls, template, x=None, y=None):
+        '''
+        Writes text with inline styles, like
+        ``'[bold]CPU[/] 93% [red]HOT[/]'``, clipped to the window.
+        Newlines go to the next line, at the same x. The template is parsed
+        once and cached, see ``cursed.markup`` for the syntax.
+
+        :param template: the text with markup
+        :param x: optional x value
+        :param y: optional y value
+        '''
+        lines = parse_markup(template)
+        if cls.VIRTUAL_PAD:
+            x, y = x or 0, y or 0
+            for i, runs in enumerate(lines):
+                col = x
+                for text, style in runs:
+                    cls.pad_write(text, col, y + i, attr=style)
+                    col += text_width(text)
+            return
+        x, y = cls._fix_xy(x, y)
+        if cls.PAD:
+            right, bottom = cls.PAD_WIDTH, cls.PAD_HEIGHT
+        else:
+            left, top, width, height = cls._cw_area()
+            right, bottom = left + width, top + height
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
+        window = cls.WINDOW
+        for runs in lines[:max(bottom - y, 0)]:
+            room = right - x
+            if runs and room > 0:
+                # One move per line, each run carries on from the cursor
+                window.move(y, x)
+                for text, style in runs:
+                    text = clip(text, room)
+                    if style is None:
+                        _draw(window.addstr, text)
+                    else:
+                        _draw(window.addstr, text, style.attr)
+                    room -= text_width(text)
+                    if room <= 0:
+                        break
             y += 1
 
     @classmethod
     def _fix_xy(cls, x, y):
-        win_x, win_y = x, y
-        curs_y, curs_x = cls.WINDOW.getyx()
-        if x is None:
-            win_x = curs_x
-        if y is None:
-            win_y = curs_y
-        if x is not None and cls.BORDERED:
-            win_x += 1
-        if y is not None and cls.BORDERED:
-            win_y += 1
-        if y is not None and cls.MENU:
-            win_y += 1
-        return win_x, win_y
+        if x is not None and y is not None:
+            return x + cls._CW_OX, y + cls._CW_OY
+        curs_y, curs_x = cls._cw_cursor()
+        if x is not None:
+            curs_x = x + cls._CW_OX
+        if y is not None:
+            curs_y = y + cls._CW_OY
+        return curs_x, curs_y
+
+    @classmethod
+    def _cw_cursor(cls):
+        '''
+        Returns the cursor as (y, x) in the window, from the shadow cursor if
+        the last drawing call left it somewhere known, else from curses.
+        '''
+        cursor = cls._CW_CURSOR[0]
+        if cursor is not None:
+            y, x = cursor
+            rows, cols = cls._CW_MAXYX
+            # A move out of the window failed and left the cursor where it was
+            if 0 <= y < rows and 0 <= x < cols:
+                return cursor
+        cursor = cls._CW_CURSOR[0] = cls.WINDOW.getyx()
+        return cursor
 
     @classmethod
     def _fix_attr(cls, attr):
-        if isinstance(attr, six.string_types):
-            return getattr(curses, 'A_%s' % attr.upper())
-        return attr
+        # Plain attributes skip the style lookup, and styles are compiled once
+        if attr is None or type(attr) is int:
+            return attr
+        return resolve_style(attr)
 
     @classmethod
     def addstr(cls, s, x=None, y=None, attr=None):
@@ -300,6 +607,8 @@ class CursedWindow(object):
         '''
         x, y = cls._fix_xy(x, y)
         attr = cls._fix_attr(attr)
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
         if attr is None:
             return cls.WINDOW.addstr(y, x, s)
         else:
@@ -308,21 +617,159 @@ class CursedWindow(object):
     @classmethod
     def addnstr(cls, s, x=None, y=None, n=None, attr=None):
         '''
-        write at most n characters at specified position or cursor.
+        write at most n cells of the string at specified position or cursor,
+        never cutting a wide character in half.
 
         :param s: string to write
         :param x: optional x value
         :param y: optional y value
-        :param n: max number of characters
+        :param n: max number of cells, or negative for the whole string
         :param attr: optional attributes
         '''
         x, y = cls._fix_xy(x, y)
         attr = cls._fix_attr(attr)
         n = cls.WIDTH if n is None else n
+        if n >= 0:
+            s = clip(s, n)
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
         if attr is None:
-            return cls.WINDOW.addnstr(y, x, s, n)
+            return cls.WINDOW.addstr(y, x, s)
+        else:
+            return cls.WINDOW.addstr(y, x, s, attr)
+
+    @classmethod
+    def blit(cls, rows, x=0, y=0, attrs=None, stride=None):
+        '''
+        Writes a block of text in one call, clipped to the window, with one
+        curses call per row or per run of equal attributes in a row.
+
+        rows can be a list of strings, a bytes buffer of stride bytes per row
+        with one character per byte, or a 2D NumPy array of code points or
+        characters. attrs is either a single attribute for the whole block, or
+        per character attributes in a list of lists or a 2D NumPy array the
+        same shape as rows.
+
+        :param rows: the text, one row per line of the window
+        :param x: x value of the top left of the block, default 0
+        :param y: y value of the top left of the block, default 0
+        :param attrs: optional attribute, or attributes for every character
+        :param stride: the length of a row, when rows is a bytes buffer
+        '''
+        rows = cls._cw_blit_rows(rows, stride)
+        if hasattr(attrs, 'tolist'):
+            attrs = attrs.tolist()
+        if attrs is None or isinstance(attrs, six.string_types +
+                                       six.integer_types + (CursedStyle,)):
+            attr, attrs = cls._fix_attr(attrs) or 0, None
+        if cls.VIRTUAL_PAD:
+            left, top = 0, 0
+            width, height = cls.PAD_WIDTH, cls.PAD_HEIGHT
+        elif cls.PAD:
+            left, top = 0, 0
+            height, width = cls.WINDOW.getmaxyx()
         else:
-            return cls.WINDOW.addnstr(y, x, s, n, attr)
+            left, top, width, height = cls._cw_area()
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
+        start = max(-x, 0)
+        for i in range(max(-y, 0), min(len(rows), height - y)):
+            row = rows[i][start:width - x]
+            if not row:
+                continue
+            if attrs is None:
+                runs = [(start, row, attr)]
+            else:
+                runs = cls._cw_attr_runs(row, attrs[i][start:width - x], start)
+            for col, text, run_attr in runs:
+                cls._cw_blit_run(text, left + x + col, top + y + i, run_attr)
+
+    @classmethod
+    def _cw_area(cls):
+        '''
+        Returns the left, top, width and height of the part of the window
+        inside its border and below its menu.
+        '''
+        border = 1 if cls.BORDERED else 0
+        top = border + (1 if cls.MENU else 0)
+        return border, top, cls.WIDTH - 2 * border, cls.HEIGHT - top - border
+
+    @classmethod
+    def _cw_draw_rows(cls, lines):
+        '''
+        Draws lines one per row of the window's area, each padded or clipped
+        to its width, and blanks the rows after the last line.
+        '''
+        _, _, cols, rows = cls._cw_area()
+        for y in range(rows):
+            line = lines[y] if y < len(lines) else ''
+            _draw(cls.addnstr, pad_text(line, cols), 0, y, cols)
+
+    @classmethod
+    def _cw_nav_keys(cls, keys, scroll, home, end, pan=None):
+        '''
+        Handles the navigation keys in keys, as returned by
+        ``getkeys(coalesce=True)``. The arrow and page keys call scroll with
+        the lines to scroll, home and end call home and end, and left and
+        right call pan with the columns to pan, if it is given.
+
+        :return: list of the (keycode, count) pairs that weren't handled
+        '''
+        rows = max(cls._cw_area()[3], 1)
+        moves = {
+            curses.KEY_UP: lambda n: scroll(-n),
+            curses.KEY_DOWN: lambda n: scroll(n),
+            curses.KEY_PPAGE: lambda n: scroll(-n * rows),
+            curses.KEY_NPAGE: lambda n: scroll(n * rows),
+            curses.KEY_HOME: lambda n: home(),
+            curses.KEY_END: lambda n: end(),
+        }
+        if pan is not None:
+            moves[curses.KEY_LEFT] = lambda n: pan(-n)
+            moves[curses.KEY_RIGHT] = lambda n: pan(n)
+        rest = []
+        for key, count in keys:
+            if key in moves:
+                moves[key](count)
+            else:
+                rest.append((key, count))
+        return rest
+
+    @staticmethod
+    def _cw_blit_rows(rows, stride):
+        if isinstance(rows, (bytes, bytearray, memoryview)):
+            if not stride:
+                raise ValueError('blit needs a stride for a bytes buffer')
+            data = bytes(rows)
+            return [data[i:i + stride].decode('latin-1')
+                    for i in range(0, len(data), stride)]
+        if hasattr(rows, 'tolist'):
+            return [
+                u''.join(c if isinstance(c, six.string_types)
+                         else six.unichr(c) for c in row)
+                for row in rows.tolist()
+            ]
+        return rows
+
+    @classmethod
+    def _cw_attr_runs(cls, row, attrs, col):
+        '''
+        Splits a row into (column, text, attr) runs of equal attributes.
+        '''
+        runs = []
+        start = 0
+        for end in range(1, len(row) + 1):
+            if end == len(row) or attrs[end] != attrs[start]:
+                runs.append((col + start, row[start:end],
+                             cls._fix_attr(attrs[start]) or 0))
+                start = end
+        return runs
+
+    @classmethod
+    def _cw_blit_run(cls, text, x, y, attr):
+        if cls.VIRTUAL_PAD:
+            return cls.pad_write(text, x, y, attr=attr)
+        _draw(cls.WINDOW.addstr, y, x, text, attr)
 
     @classmethod
     def getstr(cls, x=None, y=None, prompt=None):
@@ -335,12 +782,14 @@ class CursedWindow(object):
         :return: the string the user input
         '''
         x, y = cls._fix_xy(x, y)
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
         if prompt is not None:
             cls.WINDOW.addstr(y, x, prompt)
             x += len(prompt)
-        curses.echo()
+        cls.APP.backend.echo()
         s = cls.WINDOW.getstr(y, x)
-        curses.noecho()
+        cls.APP.backend.noecho()
         return s.decode('utf-8')
 
     @classmethod
@@ -356,6 +805,8 @@ class CursedWindow(object):
         '''
         x, y = cls._fix_xy(x, y)
         n = cls.WIDTH if n is None else n
+        cls._CW_CURSOR[0] = (y, x)
+        cls._CW_DIRTY = True
         return cls.WINDOW.hline(y, x, char, n)
 
     @classmethod
@@ -371,12 +822,24 @@ class CursedWindow(object):
         '''
         x, y = cls._fix_xy(x, y)
         n = cls.HEIGHT if n is None else n
+        cls._CW_CURSOR[0] = (y, x)
+        cls._CW_DIRTY = True
         return cls.WINDOW.vline(y, x, char, n)
 
     @classmethod
     def _cw_set_window_func(cls, attr):
         setattr(cls, attr, getattr(cls.WINDOW, attr))
 
+    @classmethod
+    def _cw_set_window_draw_func(cls, attr):
+        func = getattr(cls.WINDOW, attr)
+
+        def new_func(*args, **kwargs):
+            cls._CW_CURSOR[0] = None
+            cls._CW_DIRTY = True
+            return func(*args, **kwargs)
+        setattr(cls, attr, new_func)
+
     @classmethod
     def _cw_set_screen_func(cls, attr):
         setattr(cls, attr, getattr(cls.APP.scr, attr))
@@ -387,6 +850,8 @@ class CursedWindow(object):
 
         def new_func(s, x, y, *args, **kwargs):
             x, y = cls._fix_xy(x, y)
+            cls._CW_CURSOR[0] = None
+            cls._CW_DIRTY = True
             return func(y, x, *args, **kwargs)
         setattr(cls, attr, new_func)
 
@@ -456,6 +921,7 @@ class CursedWindow(object):
         :param y: the y value, required
         '''
         x, y = cls._fix_xy(x, y)
+        cls._CW_CURSOR[0] = (y, x)
         cls.WINDOW.move(y, x)
 
     @classmethod
@@ -469,6 +935,134 @@ class CursedWindow(object):
         '''
         cls.PAD_X, cls.PAD_Y = x, y
 
+    @classmethod
+    def pad_write(cls, s, x, y, attr=None):
+        '''
+        Writes a string onto a VIRTUAL_PAD, at x and y on the pad. It is kept
+        in a sparse store over the tiles from ``tile``, and shown on the next
+        ``refresh`` if it is in view.
+
+        :param s: string to write, on a single line
+        :param x: x position on the pad
+        :param y: y position on the pad
+        :param attr: optional attributes
+        '''
+        attr = cls._fix_attr(attr) or 0
+        tw, th = cls.TILE_WIDTH, cls.TILE_HEIGHT
+        if not 0 <= y < cls.PAD_HEIGHT:
+            return
+        for i, ch in enumerate(_cells(s)[:max(cls.PAD_WIDTH - x, 0)]):
+            key = ((x + i) // tw, y // th)
+            cls._CW_STORE.setdefault(key, {})[((x + i) % tw, y % th)] = (
+                ch, attr)
+            cls._CW_TILES.pop(key, None)
+        cls._CW_TILE_POS = None
+
+    @classmethod
+    def invalidate_tiles(cls, tx=None, ty=None):
+        '''
+        Forgets the cached tiles of a VIRTUAL_PAD, so they're built again by
+        ``tile`` on the next ``refresh``. This forgets every tile by default,
+        or a single one if tx and ty are given.
+
+        :param tx: the x of the tile, or the pad x divided by TILE_WIDTH
+        :param ty: the y of the tile, or the pad y divided by TILE_HEIGHT
+        '''
+        if tx is None or ty is None:
+            cls._CW_TILES.clear()
+        else:
+            cls._CW_TILES.pop((tx, ty), None)
+        cls._CW_TILE_POS = None
+
+    @classmethod
+    def _cw_tile(cls, tx, ty):
+        '''
+        Returns the tile at tx and ty from the cache, or builds it, evicting
+        the least recently shown tiles.
+        '''
+        tiles = cls._CW_TILES
+        key = (tx, ty)
+        if key in tiles:
+            rows = tiles.pop(key)
+        else:
+            rows = cls._cw_build_tile(tx, ty)
+            while len(tiles) >= max(cls.TILE_CACHE_SIZE, 1):
+                tiles.popitem(last=False)
+        tiles[key] = rows
+        return rows
+
+    @classmethod
+    def _cw_build_tile(cls, tx, ty):
+        '''
+        Builds a tile as a list of rows of (x, text, attr) runs, from the
+        ``tile`` classmethod and then the text written with ``pad_write``.
+        text is a string with one character per cell, or if the run has wide
+        or zero width characters a list of cells, as from ``_cells``.
+
+        ``tile(tx, ty)`` returns up to TILE_HEIGHT rows, each a string or a
+        (string, attr) pair, or None if the tile is empty.
+        '''
+        tw, th = cls.TILE_WIDTH, cls.TILE_HEIGHT
+        chars = [[' '] * tw for i in range(th)]
+        attrs = [[0] * tw for i in range(th)]
+        if 'tile' in cls._cw_callbacks():
+            for y, row in enumerate((cls.tile(tx, ty) or [])[:th]):
+                text, attr = row if isinstance(row, tuple) else (row, 0)
+                attr = cls._fix_attr(attr) or 0
+                cells = _cells(text)[:tw]
+                chars[y][:len(cells)] = cells
+                attrs[y][:len(cells)] = [attr] * len(cells)
+        for (x, y), (ch, attr) in cls._CW_STORE.get((tx, ty), {}).items():
+            chars[y][x], attrs[y][x] = ch, attr
+        rows = []
+        for y in range(th):
+            runs = []
+            start = 0
+            for x in range(1, tw + 1):
+                if x == tw or attrs[y][x] != attrs[y][start]:
+                    cells = chars[y][start:x]
+                    text = ''.join(cells)
+                    if attrs[y][start] or text.strip():
+                        if len(text) != len(cells) or '' in cells:
+                            text = cells
+                        runs.append((start, text, attrs[y][start]))
+                    start = x
+            rows.append(runs)
+        return rows
+
+    @classmethod
+    def _cw_paint_tiles(cls):
+        '''
+        Paints the tiles in view of a VIRTUAL_PAD onto its window.
+        '''
+        cls._CW_TILE_POS = (cls.PAD_X, cls.PAD_Y)
+        cls._CW_CURSOR[0] = None
+        cls._CW_DIRTY = True
+        cls.WINDOW.erase()
+        tw, th = cls.TILE_WIDTH, cls.TILE_HEIGHT
+        x0, y0 = cls.PAD_X, cls.PAD_Y
+        x1 = min(x0 + cls.WIDTH, cls.PAD_WIDTH)
+        y1 = min(y0 + cls.HEIGHT, cls.PAD_HEIGHT)
+        if x1 <= x0 or y1 <= y0:
+            return
+        for ty in range(y0 // th, (y1 - 1) // th + 1):
+            for tx in range(x0 // tw, (x1 - 1) // tw + 1):
+                rows = cls._cw_tile(tx, ty)
+                top = max(y0 - ty * th, 0)
+                bottom = min(y1 - ty * th, th)
+                for y in range(top, bottom):
+                    for x, text, attr in rows[y]:
+                        x += tx * tw
+                        start, end = max(x0 - x, 0), min(len(text), x1 - x)
+                        if start >= end:
+                            continue
+                        col, text = x + start - x0, text[start:end]
+                        if isinstance(text, list):
+                            col, text = _join_cells(text, col,
+                                                    x + end == x1)
+                        _draw(cls.WINDOW.addstr, ty * th + y - y0, col,
+                              text, attr)
+
     @classmethod
     def _cw_setup_run(cls, app, window):
         cls.RUNNING = True
@@ -480,23 +1074,65 @@ class CursedWindow(object):
         if height < cls.HEIGHT:
             raise CursedSizeError('terminal height is %d and window height '
                                   'is %d' % (height, cls.HEIGHT))
-        if cls.PAD:
-            cls.WINDOW = curses.newpad(cls.PAD_HEIGHT, cls.PAD_WIDTH)
+        cls._CW_HIDDEN = cls.WIDTH <= 0 or cls.HEIGHT <= 0
+        if cls.PAD and not cls.VIRTUAL_PAD:
+            cls.WINDOW = app.backend.newpad(cls.PAD_HEIGHT, cls.PAD_WIDTH)
         else:
-            cls.WINDOW = window.subwin(cls.HEIGHT, cls.WIDTH, cls.Y, cls.X)
+            cls.WINDOW = cls._cw_subwin(window)
+        cls._cw_setup_window()
+        if cls.BORDERED:
+            cls.WINDOW.border()
+
+    @classmethod
+    def _cw_setup_window(cls):
+        cls._CW_MAXYX = cls.WINDOW.getmaxyx()
+        cls._CW_CURSOR[0] = None
         if cls.SCROLL:
             cls.WINDOW.scrollok(True)
             cls.WINDOW.idlok(1)
-        if cls.BORDERED:
-            cls.WINDOW.border()
         for attr in cls._CW_WINDOW_FUNCS:
             cls._cw_set_window_func(attr)
+        for attr in cls._CW_WINDOW_DRAW_FUNCS:
+            cls._cw_set_window_draw_func(attr)
         for attr in cls._CW_SCREEN_FUNCS:
             cls._cw_set_screen_func(attr)
         for attr in cls._CW_WINDOW_SWAP_FUNCS:
             cls._cw_swap_window_func(attr)
         for attr in cls._CW_SCREEN_SWAP_FUNCS:
             cls._cw_swap_screen_func(attr)
+        # The functions of the new WINDOW were just set on the class
+        cls.invalidate_callbacks()
+
+    @classmethod
+    def _cw_subwin(cls, window):
+        '''
+        Creates the window's region of the screen. Hidden windows draw to an
+        offscreen pad the size of the screen instead, so drawing to them
+        doesn't fail.
+        '''
+        if cls._CW_HIDDEN:
+            height, width = window.getmaxyx()
+            return cls.APP.backend.newpad(height, width)
+        return window.subwin(cls.HEIGHT, cls.WIDTH, cls.Y, cls.X)
+
+    @classmethod
+    def _cw_relayout(cls, window):
+        '''
+        Moves the window to its new X, Y, WIDTH and HEIGHT after the terminal
+        was resized. Subwindows are recreated in place, since curses can't
+        reliably move them, and pads only need their new screen region.
+        '''
+        hidden = cls._CW_HIDDEN
+        cls._CW_HIDDEN = cls.WIDTH <= 0 or cls.HEIGHT <= 0
+        if cls._CW_HIDDEN and hidden:
+            return
+        if not cls.PAD or cls.VIRTUAL_PAD:
+            cls.WINDOW = cls._cw_subwin(window)
+            cls._cw_setup_window()
+        cls.redraw()
+        if 'resize' in cls._cw_callbacks():
+            cls.trigger('resize')
+        cls._cw_wake()
 
     @classmethod
     def redraw(cls):
@@ -508,15 +1144,46 @@ class CursedWindow(object):
             cls.WINDOW.border()
         if cls.MENU:
             cls._cw_menu_display()
+        # The tiles and scrollback in view are painted again on refresh
+        cls._CW_TILE_POS = None
+        cls._CW_HISTORY_STALE = True
         cls.refresh()
 
     @classmethod
     def refresh(cls):
-        if cls.PAD:
+        '''
+        Marks the window to be drawn to the terminal.
+        All windows refreshed since the last frame are written out together by
+        the CursedApp with a single physical screen update.
+
+        If nothing was drawn to the window and its PAD_X and PAD_Y didn't
+        change since it was last drawn, the refresh is skipped entirely.
+        '''
+        if cls.VIRTUAL_PAD and cls._CW_TILE_POS != (cls.PAD_X, cls.PAD_Y):
+            cls._cw_paint_tiles()
+        if cls._CW_HISTORY_POS is not None and (
+            # Live lines are in view too when not far back
+            cls._CW_HISTORY_STALE or cls._CW_HISTORY_POS < cls.HEIGHT
+        ):
+            cls._cw_render_history()
+        if not (cls._CW_DIRTY or cls._CW_REFRESH) and (
+            not cls.PAD or cls._CW_PAD_POS == (cls.PAD_X, cls.PAD_Y)
+        ):
+            cls.APP.stats['skipped_refreshes'] += 1
+            return
+        cls._CW_REFRESH = True
+        cls.APP._request_frame()
+
+    @classmethod
+    def _cw_noutrefresh(cls):
+        cls._CW_REFRESH = False
+        cls._CW_DIRTY = False
+        cls._CW_PAD_POS = (cls.PAD_X, cls.PAD_Y)
+        if cls.PAD and not cls.VIRTUAL_PAD:
             # First two arguments the top left of the pad region to be displayed
             # Next four arguments represent the minrow, mincol, maxrow, maxcol
             # which are the top left on the screen and bottom right.
-            cls.WINDOW.refresh(
+            cls.WINDOW.noutrefresh(
                 # Which location on the pad we scrolled to
                 cls.PAD_Y, cls.PAD_X,
                 # The top left of the pad where it is on the screen
@@ -524,8 +1191,13 @@ class CursedWindow(object):
                 # The bottom right of the pad where it is on the screen
                 cls.Y + cls.HEIGHT - 1, cls.X + cls.WIDTH - 1
             )
+        elif cls._CW_HISTORY_POS is not None:
+            cls._CW_HISTORY_PAD.noutrefresh(
+                0, 0, cls.Y, cls.X, cls.Y + cls.HEIGHT - 1,
+                cls.X + cls.WIDTH - 1
+            )
         else:
-            cls.WINDOW.refresh()
+            cls.WINDOW.noutrefresh()
 
     @classmethod
     def openmenu(cls):
@@ -541,24 +1213,64 @@ class CursedWindow(object):
 
     @classmethod
     def _cw_handle_events(cls):
-        while not cls.EVENTS.empty():
-            func_name, args, kwargs = cls.EVENTS.get()
+        # Only handle what was queued so far, so callbacks triggering more
+        # callbacks can't keep update from running
+        for i in range(cls.EVENTS.qsize()):
+            func_name, args, kwargs, future = cls.EVENTS.get()
+            func = cls._cw_find_callback(func_name)
             if func_name == 'quit':
-                if hasattr(cls, 'quit') and callable(cls.quit):
-                    result = cls.quit(*args, **kwargs)
-                    cls.RESULTS.put(('quit', args, kwargs, result))
+                result = None
+                if func is not None:
+                    result = cls._cw_call(func, args, kwargs, future)
+                    cls._cw_put_result(('quit', args, kwargs, result))
+                future.set(result)
                 cls.RUNNING = False
                 break
-            if not hasattr(cls, func_name):
-                raise CursedCallbackError('%s has no function %s' % (
-                    cls.__name__, func_name))
-            func = getattr(cls, func_name)
-            if not callable(func):
-                raise CursedCallbackError('%s has no callable %s' % (
+            if func is None:
+                # It was removed since it was triggered
+                error = CursedCallbackError('%s has no callable %s' % (
                     cls.__name__, func_name))
-            cls.RESULTS.put(
-                (func_name, args, kwargs, func(*args, **kwargs))
-            )
+                future.set_exception(error)
+                raise error
+            result = cls._cw_call(func, args, kwargs, future)
+            future.set(result)
+            cls._cw_put_result((func_name, args, kwargs, result))
+        if cls.RUNNING and not cls.EVENTS.empty():
+            cls._cw_wake()
+
+    @staticmethod
+    def _cw_call(func, args, kwargs, future):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            # The caller waiting on the future sees it, and so does the app
+            future.set_exception(e)
+            raise
+
+    @classmethod
+    def _cw_put_result(cls, result):
+        '''
+        Keeps the result in RESULTS, dropping the oldest one once there are
+        RESULTS_SIZE of them, or nothing at all if RESULTS_SIZE is 0.
+        '''
+        if not cls.RESULTS_SIZE:
+            return
+        while True:
+            try:
+                return cls.RESULTS.put_nowait(result)
+            except Full:
+                cls.RESULTS.get_nowait()
+
+    @classmethod
+    def _cw_cancel_events(cls):
+        '''
+        Fails the futures of the callbacks left when the window stopped, so
+        nobody waits on them forever.
+        '''
+        while not cls.EVENTS.empty():
+            func_name, args, kwargs, future = cls.EVENTS.get()
+            future.set_exception(CursedCallbackError(
+                '%s quit before running %s' % (cls.__name__, func_name)))
 
     @classmethod
     def _cw_menu_display(cls):
@@ -570,25 +1282,24 @@ class CursedWindow(object):
         saved_pos = cls.getxy()
         for menu in Menu.ALL:
             # double check we're not going to write out of bounds
-            if x + len(menu.title) + 2 >= cls.WIDTH:
+            title_width = text_width(menu.title)
+            if x + title_width + 2 >= cls.WIDTH:
                 raise CursedSizeError('Menu %s exceeds width of window: x=%d' %
                                       (menu.title, x))
             y = -1
             cls.addstr(menu.title + '  ', x, y, attr=menu_attrs)
-            mxlen = max([len(str(i)) for i in menu.items])
+            mxlen = max([text_width(str(i)) for i in menu.items])
             if menu is cls._OPENED_MENU:
                 for item in menu.items:
                     y += 1
-                    itemstr = str(item)
-                    wspace = (mxlen - len(itemstr)) * ' '
-                    itemstr = itemstr + wspace
+                    itemstr = pad_text(str(item), mxlen)
                     if item is menu.selected:
                         attr = curses.A_UNDERLINE
                     else:
                         attr = curses.A_REVERSE
                     cls.addstr(itemstr, x, y, attr=attr)
             # For the empty space filler
-            x += len(menu.title) + 2
+            x += title_width + 2
         # color the rest of the top of the window
         extra = 2 if cls.BORDERED else 0
         cls.addstr(' ' * (cls.WIDTH - x - extra), x, -1, attr=menu_attrs)
@@ -637,8 +1348,46 @@ class CursedWindow(object):
         if cb:
             cls.trigger(cb)
 
+    @classmethod
+    def _cw_menu_mouse(cls, event):
+        '''
+        Handles a mouse event on the menu bar or an open menu, returning False
+        if it had nothing to do with the menu.
+        '''
+        if event.menu is not None:
+            if event.clicked():
+                if event.menu is cls._OPENED_MENU:
+                    cls._OPENED_MENU = None
+                else:
+                    cls._OPENED_MENU = event.menu
+                Menu.clear_select()
+                cls.redraw()
+            return True
+        menu = cls._OPENED_MENU
+        if menu is None:
+            return False
+        x = [x0 for x0, x1, m in cls.APP._hit_index.menus[cls] if m is menu][0]
+        mxlen = max([text_width(str(i)) for i in menu.items])
+        item = None
+        if 0 <= event.y < len(menu.items) and x <= event.x < x + mxlen:
+            item = menu.items[event.y]
+        if event.clicked():
+            if item is None:
+                cls._OPENED_MENU = None
+                Menu.clear_select()
+                cls.redraw()
+            else:
+                menu.selected = item
+                cls._cw_menu_enter()
+        elif item is not None and item is not menu.selected:
+            menu.selected = item
+            cls.redraw()
+        return True
+
     @classmethod
     def _cw_menu_update(cls):
+        while cls.MOUSE_EVENTS and cls._cw_menu_mouse(cls.MOUSE_EVENTS[0]):
+            cls.MOUSE_EVENTS.popleft()
         if cls.KEY_EVENTS.empty():
             return None
         c = cls.KEY_EVENTS.get()
@@ -672,21 +1421,111 @@ class CursedWindow(object):
                 Menu.clear_select()
                 cls.redraw()
 
+    @classmethod
+    def _cw_wake(cls):
+        cls._CW_WAKE.set()
+
+    @classmethod
+    def _cw_put_key(cls, c):
+        try:
+            cls.KEY_EVENTS.put_nowait(c)
+        except Full:
+            # Drop the oldest key rather than growing without bound
+            cls.KEY_EVENTS.get_nowait()
+            cls.KEY_EVENTS.put_nowait(c)
+        cls._cw_wake()
+
+    @classmethod
+    def _cw_put_mouse(cls, event):
+        # Merge bursts of motion and wheel events instead of queueing each one
+        if not (cls.MOUSE_EVENTS and cls.MOUSE_EVENTS[-1]._merge(event)):
+            cls.MOUSE_EVENTS.append(event)
+        cls._cw_wake()
+
+    @classmethod
+    def getmouse(cls):
+        '''
+        Get the next mouse event for this window, or None.
+        The app must be created with ``CursedApp(mouse=True)``.
+        Example:
+        ::
+
+            event = cls.getmouse()
+            if event is not None and event.clicked():
+                cls.addstr('clicked', event.x, event.y)
+
+        :return: a ``cursed.mouse.CursedMouseEvent``
+        '''
+        if not cls.MOUSE_EVENTS:
+            return None
+        return cls.MOUSE_EVENTS.popleft()
+
+    @classmethod
+    def focus(cls):
+        '''
+        Gives this window the keyboard focus, so the keys typed are sent to it.
+        '''
+        cls.APP.focus(cls)
+
+    @classmethod
+    def has_focus(cls):
+        '''
+        Returns True if this window has the keyboard focus.
+        '''
+        return cls.APP.focused is cls
+
+    @classmethod
+    def _cw_sleep(cls, next_update):
+        '''
+        Sleeps until next_update or until a key or event wakes the window up.
+        Returns True if it was woken up.
+        '''
+        if cls.UPDATE_INTERVAL is None and not cls.UPDATE_ON_EVENT:
+            gevent.sleep(0)
+            return True
+        timeout = None
+        if cls.UPDATE_INTERVAL is not None:
+            timeout = max(next_update - time.time(), 0)
+        if timeout == 0:
+            gevent.sleep(0)
+        else:
+            cls._CW_WAKE.wait(timeout)
+        woken = cls._CW_WAKE.is_set()
+        cls._CW_WAKE.clear()
+        return woken
+
     @classmethod
     def _cw_run(cls, app, window):
         cls._cw_setup_run(app, window)
         cls.redraw()
-        has_update = hasattr(cls, 'update') and callable(cls.update)
-        if hasattr(cls, 'init') and callable(cls.init):
+        callbacks = cls._cw_callbacks()
+        has_update = 'update' in callbacks
+        if 'init' in callbacks:
             cls.trigger('init')
-        while cls.RUNNING:
-            # Yield to others for a bit
-            gevent.sleep(0)
-            if cls.MENU and cls.RUNNING:
-                cls._cw_menu_update()
-            cls._cw_handle_events()
-            if has_update and cls.RUNNING:
+        # Always run the first update, even for UPDATE_ON_EVENT windows
+        cls._cw_wake()
+        next_update = 0
+        try:
+            while cls.RUNNING:
+                # Yield to others until the next update is due or we're woken
+                # up
+                woken = cls._cw_sleep(next_update)
+                if cls.MENU and cls.RUNNING:
+                    cls._cw_menu_update()
+                cls._cw_handle_events()
+                if not (has_update and cls.RUNNING):
+                    continue
+                due = time.time() >= next_update
+                if cls.UPDATE_ON_EVENT:
+                    due = woken or (cls.UPDATE_INTERVAL is not None and due)
+                if not due:
+                    continue
+                app.stats['updates'] += 1
                 cls.update()
+                if cls.UPDATE_INTERVAL is not None:
+                    next_update = time.time() + cls.UPDATE_INTERVAL
+        finally:
+            cls._cw_cancel_events()
 
     @classmethod
     def trigger(cls, func_name, *args, **kwargs):
@@ -701,11 +1540,188 @@ class CursedWindow(object):
 
             MainWindow.trigger('quit')
 
+        It returns a gevent AsyncResult, which can be ignored, or waited on
+        from another window with ``get()`` for the function's return value:
+        ::
+
+            count = CounterWindow.trigger('count').get()
+
+        Don't wait on a callback of the same window, since it only runs once
+        the caller returns.
+
         :param func_name: the name of the function to run
         :param args: the positional arguments, *args
         :param kwargs: the keyword arguments, **kwargs
+        :return: a gevent AsyncResult for the return value
+        :raises CursedCallbackError: if the window has no such function, or
+            its EVENT_QUEUE_SIZE is full and it can't wait for room
         '''
-        cls.EVENTS.put((func_name, args, kwargs))
+        if func_name != 'quit' and cls._cw_find_callback(func_name) is None:
+            raise CursedCallbackError('%s has no callable %s' % (
+                cls.__name__, func_name))
+        future = AsyncResult()
+        cls.EVENTS.put(
+            (func_name, args, kwargs, future),
+            # quit skips ahead of any backlog of callbacks
+            priority=func_name == 'quit',
+            # A window can't wait for room in its own queue
+            block=gevent.getcurrent() is not getattr(cls, 'THREAD', None),
+        )
+        cls._cw_wake()
+        return future
+
+    @classmethod
+    def trigger_background(cls, func_name, *args, **kwargs):
+        '''
+        Runs a class function in a thread from gevent's thread pool, so a
+        blocking or slow call doesn't freeze every window, then triggers
+        callback with its return value, like:
+        ::
+
+            DisplayWindow.trigger_background('fetch', url, callback='show')
+
+        The function runs outside of the window's greenlet, so it should only
+        compute or fetch its result, and leave drawing to the callback.
+        If it raises, errback is triggered with the exception, or if there is
+        no errback the exception is raised in the window like any failing
+        callback.
+
+        :param func_name: the name of the function to run
+        :param args: the positional arguments, *args
+        :param callback: name of the function triggered with the result
+        :param errback: name of the function triggered with the exception
+        :param kwargs: the other keyword arguments, **kwargs
+        :return: the greenlet waiting for the thread
+        :raises CursedCallbackError: if the window has no such function,
+            callback or errback
+        '''
+        callback = kwargs.pop('callback', None)
+        errback = kwargs.pop('errback', None)
+        for name in (func_name, callback, errback):
+            if name is not None and cls._cw_find_callback(name) is None:
+                raise CursedCallbackError('%s has no callable %s' % (
+                    cls.__name__, name))
+        func = cls._cw_callbacks()[func_name]
+
+        def run():
+            ok, result = _run_in_thread(func, args, kwargs)
+            if not ok:
+                cls.trigger(errback or '_cw_raise', result)
+            elif callback is not None:
+                cls.trigger(callback, result)
+
+        return gevent.spawn(run)
+
+    @classmethod
+    def invalidate_callbacks(cls):
+        '''
+        Forgets the window's table of callbacks, so it is built again the
+        next time one is triggered. Call it after replacing a callback of a
+        running window, like ``Window.update = classmethod(new_update)``.
+        Callbacks added or deleted are found without it.
+        '''
+        cls._CW_CALLBACKS = (None, None)
+
+    @classmethod
+    def _cw_find_callback(cls, func_name):
+        '''
+        Returns the window's callback named func_name, or None, building the
+        table again first if the name isn't in it, in case it was added since.
+        '''
+        func = cls._cw_callbacks().get(func_name)
+        if func is None:
+            cls.invalidate_callbacks()
+            func = cls._cw_callbacks().get(func_name)
+        return func
+
+    @classmethod
+    def _cw_raise(cls, exc):
+        raise exc
+
+
+def background(func):
+    '''
+    Decorates a function of a window so it runs in a thread from gevent's
+    thread pool. The window calling it waits for its result, while the other
+    windows keep running:
+    ::
+
+        class DisplayWindow(CursedWindow):
+
+            @classmethod
+            @background
+            def fetch(cls, url):
+                return requests.get(url)
+
+    Like with ``trigger_background``, the function shouldn't draw.
+    '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        ok, result = _run_in_thread(func, args, kwargs)
+        if not ok:
+            raise result
+        return result
+    return wrapper
+
+
+def _cells(s):
+    '''
+    Splits a string into the cells it takes on the terminal, one string per
+    cell. A wide character is followed by '' for its second cell, and zero
+    width characters are kept in the cell of the character before them.
+    '''
+    cells = []
+    for ch in s:
+        cells_wide = char_width(ch)
+        if cells_wide == 0 and cells:
+            cells[-1] += ch
+            continue
+        cells.append(ch)
+        if cells_wide == 2:
+            cells.append('')
+    return cells
+
+
+def _join_cells(cells, col, right_edge):
+    '''
+    Joins cells sliced from a run into the text to draw at col, returning
+    (col, text). A wide character cut in half by the edge of the view is
+    drawn as a space, and the second cell of one drawn just to the left is
+    skipped.
+    '''
+    if cells[0] == '':
+        if col:
+            cells, col = cells[1:], col + 1
+        else:
+            cells[0] = ' '
+    if right_edge and cells and cells[-1] and char_width(cells[-1][0]) == 2:
+        cells[-1] = ' '
+    return col, ''.join(cells)
+
+
+def _draw(func, *args):
+    '''
+    Calls a curses drawing function, ignoring the error curses raises after
+    drawing the bottom right cell of a window, since the cursor can't move
+    past it.
+    '''
+    try:
+        func(*args)
+    except curses.error:
+        pass
+
+
+def _run_in_thread(func, args, kwargs):
+    '''
+    Calls func in gevent's thread pool, returning (True, result), or
+    (False, exception) so the thread pool doesn't print it over the screen.
+    '''
+    def call():
+        try:
+            return True, func(*args, **kwargs)
+        except Exception as e:
+            return False, e
+    return gevent.get_hub().threadpool.apply(call)
 
 
 def _debug(s):
@@ -70,12 +70,28 @@ class DisplayWindow(CursedWindow):
     @classmethod
     def get_request(cls, url):
         cls.redraw()
-        try:
-            cls.response = requests.get(url)
-        except Exception as e:
-            cls.addstr('Error: {0}'.format(e), 0, 0)
-        else:
-            cls.write(cls.response.content, 0, 0)
+        cls.addstr('Loading {0}...'.format(url), 0, 0)
+        cls.refresh()
+        # The request runs in a thread, so the other windows keep responding
+        cls.trigger_background('fetch', url, callback='show',
+                               errback='show_error')
+
+    @classmethod
+    def fetch(cls, url):
+        return requests.get(url)
+
+    @classmethod
+    def show(cls, response):
+        cls.response = response
+        cls.redraw()
+        cls.write(response.text, 0, 0)
+        cls.refresh()
+
+    @classmethod
+    def show_error(cls, e):
+        cls.redraw()
+        cls.addstr('Error: {0}'.format(e), 0, 0)
+        cls.refresh()
 
 
 result = app.run()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+from cursed import CursedApp, CursedWindow, CursedHSplit, CursedVSplit
+from cursed import CursedPane
+app = CursedApp()
+
+
+class Sidebar(CursedWindow):
+    WIDTH, HEIGHT = 'layout', 'layout'
+    BORDERED = True
+    UPDATE_ON_EVENT = True
+    WANTS_KEYS = True
+
+    @classmethod
+    def update(cls):
+        c = cls.getkey()
+        if c == 'q':
+            for window in (Sidebar, Main, Footer):
+                window.trigger('quit')
+            return
+        elif c == '+':
+            SIDEBAR.set(size=min(SIDEBAR.size + 5, 60))
+            app.relayout()
+        elif c == '-':
+            SIDEBAR.set(size=max(SIDEBAR.size - 5, 0))
+            app.relayout()
+        cls.write('Sidebar', x=0, y=0)
+        cls.refresh()
+
+
+class Main(CursedWindow):
+    WIDTH, HEIGHT = 'layout', 'layout'
+    BORDERED = True
+    UPDATE_ON_EVENT = True
+
+    @classmethod
+    def update(cls):
+        cls.write('Main {}x{}'.format(cls.WIDTH, cls.HEIGHT), x=0, y=0)
+        cls.refresh()
+
+    @classmethod
+    def resize(cls):
+        cls.update()
+
+
+class Footer(CursedWindow):
+    WIDTH, HEIGHT = 'layout', 'layout'
+    UPDATE_ON_EVENT = True
+
+    @classmethod
+    def update(cls):
+        cls.addstr('Press + or - to resize the sidebar, q to exit', 0, 0)
+        cls.refresh()
+
+
+SIDEBAR = CursedPane(Sidebar, size=20, max_size=60)
+app.set_layout(CursedHSplit(
+    SIDEBAR,
+    CursedVSplit(Main, CursedPane(Footer, size=1)),
+))
+
+result = app.run()
+print(result)
+if result.interrupted():
+    print('Ctrl-C pressed.')
+else:
+    result.unwrap()
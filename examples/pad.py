@@ -72,29 +72,31 @@ class MainPad(CursedWindow):
 
     @classmethod
     def update(cls):
-        key = cls.getch()
-        if key is not None:
+        for y in range(cls.PAD_Y, cls.PAD_Y + cls.HEIGHT):
+            s = cls.MAP[y][cls.PAD_X:cls.PAD_X + cls.PAD_HEIGHT]
+            s = ''.join(x for x in s)
+            cls.addstr(s, cls.PAD_X, y)
+        cls.refresh()
+        # Sleep until a key is pressed, instead of redrawing constantly, then
+        # handle every key pressed since in one go, so a held arrow key only
+        # redraws once.
+        for key, count in cls.getkeys(coalesce=True, timeout=None):
             if key == curses.KEY_UP:
-                cls.PAD_Y = max(cls.PAD_Y - 1, 0)
+                cls.PAD_Y = max(cls.PAD_Y - count, 0)
             elif key == curses.KEY_DOWN:
                 cls.PAD_Y = min(
-                    cls.PAD_Y + 1,
+                    cls.PAD_Y + count,
                     cls.PAD_HEIGHT - (cls.HEIGHT + 1)
                 )
             elif key == curses.KEY_LEFT:
-                cls.PAD_X = max(cls.PAD_X - 1, 0)
+                cls.PAD_X = max(cls.PAD_X - count, 0)
             elif key == curses.KEY_RIGHT:
                 cls.PAD_X = min(
-                    cls.PAD_X + 1,
+                    cls.PAD_X + count,
                     cls.PAD_WIDTH - (cls.WIDTH + 1)
                 )
             elif key == ord('q'):
                 cls.trigger('quit')
-        for y in range(cls.PAD_Y, cls.PAD_Y + cls.HEIGHT):
-            s = cls.MAP[y][cls.PAD_X:cls.PAD_X + cls.PAD_HEIGHT]
-            s = ''.join(x for x in s)
-            cls.addstr(s, cls.PAD_X, y)
-        cls.refresh()
 
 
 result = app.run()
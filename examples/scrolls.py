@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import curses
 from cursed import CursedApp, CursedWindow
 app = CursedApp()
 
@@ -7,6 +8,7 @@ class ScrollingWindow(CursedWindow):
     WIDTH = 'max'
     HEIGHT = 23
     SCROLL = True
+    SCROLLBACK = 10000
     i = 0
 
     @classmethod
@@ -15,6 +17,12 @@ class ScrollingWindow(CursedWindow):
         if c == 27:
             cls.trigger('quit')
             return
+        elif c == curses.KEY_PPAGE:
+            cls.history_up()
+        elif c == curses.KEY_NPAGE:
+            cls.history_down()
+        elif c == curses.KEY_END:
+            cls.history_end()
         cls.addstr('{}'.format(cls.i))
         cls.nextline()
         cls.i += 1
@@ -28,7 +36,7 @@ class FooterWindow(CursedWindow):
 
     @classmethod
     def init(cls):
-        cls.addstr('Press ESCAPE to exit')
+        cls.addstr('Press ESCAPE to exit, page up and down for history')
         cls.refresh()
         cls.trigger('quit')
 
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+import sys
+from cursed import CursedApp, CursedTail
+app = CursedApp()
+
+
+class LogTail(CursedTail):
+    WIDTH, HEIGHT = 'max', 'max'
+    BORDERED = True
+    PATH = sys.argv[1] if len(sys.argv) > 1 else '/var/log/syslog'
+
+    @classmethod
+    def update(cls):
+        keys = cls.getkeys(coalesce=True, timeout=None)
+        for key, count in cls.handle_keys(keys):
+            if key in (27, ord('q')):
+                cls.trigger('quit')
+        cls.render()
+
+
+result = app.run()
+print(result)
+if result.interrupted():
+    print('Ctrl-C pressed.')
+else:
+    result.unwrap()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+import sys
+from cursed import CursedApp, CursedViewer
+app = CursedApp()
+
+
+class FileViewer(CursedViewer):
+    WIDTH, HEIGHT = 'max', 'max'
+    BORDERED = True
+    PATH = sys.argv[1] if len(sys.argv) > 1 else __file__
+
+    @classmethod
+    def update(cls):
+        cls.render()
+        for key, count in cls.handle_keys(
+            cls.getkeys(coalesce=True, timeout=None)
+        ):
+            if key in (27, ord('q')):
+                cls.trigger('quit')
+
+
+result = app.run()
+print(result)
+if result.interrupted():
+    print('Ctrl-C pressed.')
+else:
+    result.unwrap()
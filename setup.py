@@ -44,9 +44,9 @@ setup(
         'gevent', 'six',
     ],
     entry_points={
-        # 'console_scripts': [
-        #     'cursed=cursed:main',
-        # ],
+        'console_scripts': [
+            'cursed-bench=cursed.bench:main',
+        ],
     },
     # package_data={
     # 'cursed': ['catalog/*.edb'],
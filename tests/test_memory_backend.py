@@ -0,0 +1,1420 @@
+# -*- coding: utf-8 -*-
+'''
+Runs small applications on the MemoryBackend and checks what ends up on the
+screen, without a terminal:
+::
+
+    $ python -m pytest tests/
+'''
+
+from __future__ import unicode_literals
+
+import os
+import time
+import curses
+import gevent
+import pytest
+
+from cursed import CursedApp, CursedWindow, CursedMenu, define_style
+from cursed import background
+from cursed import CursedHSplit, CursedVSplit, CursedPane
+from cursed import CursedViewer, CursedTail
+from cursed import bench
+from cursed.backend import MemoryBackend
+from cursed.exceptions import CursedCallbackError, CursedWindowError
+from cursed.menu import _Menu as Menu
+from cursed.meta import CursedWindowClass
+from cursed.style import resolve
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    '''
+    Forgets the windows and menus each test declares.
+    '''
+    yield
+    del CursedWindowClass.WINDOWS[:]
+    del Menu.ALL[:]
+    Menu.KEY_MAP.clear()
+    Menu.TITLE_MAP.clear()
+
+
+def run(app, script=None, timeout=5):
+    '''
+    Runs the app, with script in its own greenlet if given, and fails the
+    test instead of hanging if the app doesn't quit in time.
+    '''
+    if script is not None:
+        gevent.spawn(script)
+    with gevent.Timeout(timeout):
+        result = app.run()
+    result.unwrap()
+    return result
+
+
+def quit_all(*windows):
+    for cw in windows:
+        cw.trigger('quit')
+
+
+def test_write_bordered():
+    backend = MemoryBackend(12, 4)
+    app = CursedApp(backend=backend)
+
+    class Box(CursedWindow):
+        WIDTH, HEIGHT = 12, 4
+        BORDERED = True
+
+        @classmethod
+        def init(cls):
+            cls.write('hi', 0, 0)
+            cls.addstr('there', 1, 1, attr='bold')
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    assert backend.screen_text() == [
+        '+----------+',
+        '|hi        |',
+        '| there    |',
+        '+----------+',
+    ]
+    assert backend.cell(2, 2) == ('t', curses.A_BOLD)
+    assert backend.cell(1, 1) == ('h', 0)
+
+
+def test_resize_relayout():
+    backend = MemoryBackend(40, 10)
+    app = CursedApp(backend=backend)
+
+    class Left(CursedWindow):
+        WIDTH, HEIGHT = 20, 'max'
+        BORDERED = True
+        resized = 0
+
+        @classmethod
+        def resize(cls):
+            cls.resized += 1
+
+    class Right(CursedWindow):
+        X, WIDTH, HEIGHT = 20, 'max', 5
+        BORDERED = True
+        UPDATE_ON_EVENT = True
+
+        @classmethod
+        def update(cls):
+            cls.write('%dx%d' % (cls.WIDTH, cls.HEIGHT), 0, 0)
+            cls.refresh()
+
+    seen = {}
+
+    def script():
+        gevent.sleep(0.1)
+        seen['before'] = backend.screen_text()
+        backend.resize(60, 14)
+        gevent.sleep(0.2)
+        seen['after'] = backend.screen_text()
+        quit_all(Left, Right)
+
+    run(app, script)
+    assert seen['before'][1] == '|' + ' ' * 18 + '||20x5' + ' ' * 14 + '|'
+    after = seen['after']
+    assert len(after) == 14 and len(after[0]) == 60
+    assert Left.HEIGHT == 14 and Right.WIDTH == 40
+    assert after[1][20:26] == '|40x5 '
+    assert after[13] == '+' + '-' * 18 + '+' + ' ' * 40
+    assert Left.resized == 1
+
+
+def test_focus_routing():
+    backend = MemoryBackend(40, 10)
+    app = CursedApp(backend=backend)
+
+    class A(CursedWindow):
+        WIDTH, HEIGHT = 20, 5
+        UPDATE_ON_EVENT = True
+        got = []
+
+        @classmethod
+        def init(cls):
+            cls.focus()
+
+        @classmethod
+        def update(cls):
+            key = cls.getch()
+            if key is not None:
+                cls.got.append(chr(key))
+                if key == 9:
+                    cls.APP.focus_next()
+
+    class B(CursedWindow):
+        X, WIDTH, HEIGHT = 20, 20, 5
+        UPDATE_ON_EVENT = True
+        got = []
+
+        @classmethod
+        def update(cls):
+            key = cls.getch()
+            if key is not None:
+                cls.got.append(chr(key))
+
+    class Logger(CursedWindow):
+        Y, WIDTH, HEIGHT = 5, 40, 5
+        WANTS_KEYS = True
+
+    def script():
+        gevent.sleep(0.05)
+        backend.push_keys('ab\t')
+        gevent.sleep(0.05)
+        backend.push_keys('cd')
+        gevent.sleep(0.05)
+        quit_all(A, B, Logger)
+
+    run(app, script)
+    assert A.got == ['a', 'b', '\t']
+    assert B.got == ['c', 'd']
+    assert Logger.KEY_EVENTS.qsize() == 5
+
+
+def test_trigger_returns_future():
+    app = CursedApp(backend=MemoryBackend(10, 4))
+    results = {}
+
+    class Counter(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        n = 0
+
+        @classmethod
+        def count(cls, k=1):
+            cls.n += k
+            return cls.n
+
+    class Caller(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 10, 2
+
+        @classmethod
+        def init(cls):
+            futures = [Counter.trigger('count') for i in range(10)]
+            results['last'] = Counter.trigger('count', 5).get(timeout=1)
+            results['tenth'] = futures[-1].get(timeout=1)
+            with pytest.raises(CursedCallbackError):
+                Counter.trigger('missing')
+            quit_all(Counter, cls)
+
+    run(app)
+    assert results == {'last': 15, 'tenth': 10}
+
+
+def test_coalesce_policy():
+    app = CursedApp(backend=MemoryBackend(10, 4))
+    results = {}
+
+    class Data(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        EVENT_POLICY = 'coalesce'
+        EVENT_QUEUE_SIZE = 8
+        calls = []
+
+        @classmethod
+        def refresh_data(cls, n):
+            cls.calls.append(n)
+            return n
+
+    class Caller(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 10, 2
+
+        @classmethod
+        def init(cls):
+            futures = [Data.trigger('refresh_data', i) for i in range(100)]
+            results['first'] = futures[0].get(timeout=1)
+            quit_all(Data, cls)
+
+    run(app)
+    assert Data.calls == [99]
+    assert results['first'] == 99
+
+
+def test_drop_oldest_policy():
+    app = CursedApp(backend=MemoryBackend(10, 4))
+    results = {}
+
+    class Slow(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        EVENT_POLICY = 'drop-oldest'
+        EVENT_QUEUE_SIZE = 2
+        calls = []
+
+        @classmethod
+        def job(cls, n):
+            cls.calls.append(n)
+
+    class Caller(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 10, 2
+
+        @classmethod
+        def init(cls):
+            futures = [Slow.trigger('job', i) for i in range(5)]
+            with pytest.raises(CursedCallbackError):
+                futures[0].get(timeout=1)
+            futures[-1].get(timeout=1)
+            results['dropped'] = Slow.EVENTS.dropped
+            quit_all(Slow, cls)
+
+    run(app)
+    assert Slow.calls == [3, 4]
+    assert results['dropped'] == 3
+
+
+def test_block_policy_in_own_window():
+    app = CursedApp(backend=MemoryBackend(10, 2))
+    results = {}
+
+    class Own(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        EVENT_QUEUE_SIZE = 3
+        calls = 0
+
+        @classmethod
+        def job(cls):
+            cls.calls += 1
+
+        @classmethod
+        def init(cls):
+            for i in range(3):
+                cls.trigger('job')
+            with pytest.raises(CursedCallbackError):
+                cls.trigger('job')
+            results['queued'] = cls.EVENTS.qsize()
+            cls.trigger('quit')
+
+    run(app)
+    assert results['queued'] == 3
+
+
+def test_unbounded_by_default():
+    app = CursedApp(backend=MemoryBackend(10, 2))
+
+    class Own(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        calls = 0
+
+        @classmethod
+        def job(cls):
+            cls.calls += 1
+
+        @classmethod
+        def done(cls):
+            cls.trigger('quit')
+
+        @classmethod
+        def init(cls):
+            for i in range(2000):
+                cls.trigger('job')
+            cls.trigger('done')
+
+    run(app)
+    assert Own.calls == 2000
+
+
+def test_markup():
+    backend = MemoryBackend(20, 2)
+    app = CursedApp(backend=backend)
+    define_style('hot', 'bold red')
+
+    class Status(CursedWindow):
+        WIDTH, HEIGHT = 20, 2
+
+        @classmethod
+        def init(cls):
+            cls.write_markup('CPU [hot]93%[/] [[ok]\n[underline]x[/]', 0, 0)
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    assert backend.screen_text() == ['CPU 93% [ok]'.ljust(20), 'x'.ljust(20)]
+    assert backend.cell(0, 0)[1] == 0
+    assert backend.cell(4, 0)[1] & curses.A_BOLD
+    assert backend.pair_content(backend.cell(4, 0)[1]) == (
+        curses.COLOR_RED, -1)
+    assert backend.cell(7, 0)[1] == 0
+    assert backend.cell(0, 1)[1] == curses.A_UNDERLINE
+
+
+def test_markup_sees_redefined_style():
+    backend = MemoryBackend(10, 1)
+    app = CursedApp(backend=backend)
+    define_style('mark', 'bold')
+
+    class Line(CursedWindow):
+        WIDTH, HEIGHT = 10, 1
+
+        @classmethod
+        def init(cls):
+            cls.write_markup('[mark]a[/]', 0, 0)
+            define_style('mark', 'underline')
+            cls.write_markup('[mark]a[/]', 1, 0)
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    assert backend.cell(0, 0)[1] == resolve('bold')
+    assert backend.cell(1, 0)[1] == resolve('underline')
+
+
+def test_wide_characters_clip():
+    backend = MemoryBackend(7, 3)
+    app = CursedApp(backend=backend)
+
+    class Narrow(CursedWindow):
+        WIDTH, HEIGHT = 7, 3
+        BORDERED = True
+
+        @classmethod
+        def init(cls):
+            cls.write('你好世界', 0, 0)
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    # Only two of the characters fit in the five cells, the third would be
+    # cut in half
+    assert backend.screen_text()[1] == '|你好 |'
+    assert backend.cell(1, 1) == ('你', 0)
+    assert backend.cell(2, 1)[0] == ''
+    assert backend.cell(5, 1) == (' ', 0)
+    assert backend.cell(6, 1)[0] == '|'
+
+
+def test_shadow_cursor():
+    app = CursedApp(backend=MemoryBackend(30, 10))
+    mismatches = []
+
+    class Cursor(CursedWindow):
+        X, Y, WIDTH, HEIGHT = 2, 1, 20, 6
+        BORDERED = True
+
+        @classmethod
+        def check(cls, label):
+            real = cls.WINDOW.getyx()
+            if cls._cw_cursor() != real:
+                mismatches.append((label, cls._cw_cursor(), real))
+
+        @classmethod
+        def init(cls):
+            cls.addstr('hello', 1, 1)
+            cls.check('addstr')
+            cls.addstr(' world')
+            cls.check('addstr after')
+            cls.addstr('日本', 0, 2)
+            cls.check('wide')
+            cls.insstr('ins', 3, 3)
+            cls.check('insstr')
+            cls.move(4, 4)
+            cls.check('move')
+            assert cls.getxy() == (4, 4)
+            cls.hline(0, 2, '-', 5)
+            cls.check('hline')
+            cls.write('one\ntwo', 2, 1)
+            cls.check('write')
+            cls.write_markup('[bold]m[/]k', 1, 1)
+            cls.check('markup')
+            cls.erase()
+            cls.addstr('z')
+            cls.check('after erase')
+            cls.trigger('quit')
+
+    run(app)
+    assert mismatches == []
+
+
+def test_failing_window_stops_sleeping_windows():
+    app = CursedApp(backend=MemoryBackend(10, 6))
+
+    class Idle(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        UPDATE_ON_EVENT = True
+
+        @classmethod
+        def update(cls):
+            pass
+
+    class Reader(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 10, 2
+
+        @classmethod
+        def update(cls):
+            cls.getch(timeout=None)
+
+    class Broken(CursedWindow):
+        Y, WIDTH, HEIGHT = 4, 10, 2
+
+        @classmethod
+        def init(cls):
+            cls.sleep(0.05)
+            raise ValueError('broken')
+
+    with gevent.Timeout(3):
+        result = app.run()
+    assert isinstance(result.err(), ValueError)
+    assert not Idle.RUNNING and not Reader.RUNNING
+
+
+def test_nested_markup():
+    backend = MemoryBackend(10, 1)
+    app = CursedApp(backend=backend)
+
+    class Line(CursedWindow):
+        WIDTH, HEIGHT = 10, 1
+
+        @classmethod
+        def init(cls):
+            cls.write_markup('[bold][underline]x[/]y[/][red][bold]z[/][/]',
+                             0, 0)
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    assert backend.screen_text() == ['xyz'.ljust(10)]
+    assert backend.cell(0, 0)[1] == curses.A_BOLD | curses.A_UNDERLINE
+    assert backend.cell(1, 0)[1] == curses.A_BOLD
+    assert backend.cell(2, 0)[1] & curses.A_BOLD
+    assert backend.pair_content(backend.cell(2, 0)[1]) == (
+        curses.COLOR_RED, -1)
+
+
+def test_color_pairs_allocated_on_demand():
+    backend = MemoryBackend(10, 1)
+    app = CursedApp(backend=backend)
+
+    class Line(CursedWindow):
+        WIDTH, HEIGHT = 10, 1
+
+        @classmethod
+        def init(cls):
+            cls.addstr('a', 0, 0, attr='red on blue')
+            cls.addstr('b', 1, 0, attr='bold red on blue')
+            cls.addstr('c', 2, 0, attr='green')
+            cls.addstr('d', 3, 0, attr='underline')
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    # Styles with the same colors share a pair, and no colors need none
+    assert backend.pairs == {
+        1: (curses.COLOR_RED, curses.COLOR_BLUE),
+        2: (curses.COLOR_GREEN, -1),
+    }
+    assert backend.cell(1, 0)[1] == backend.cell(0, 0)[1] | curses.A_BOLD
+    assert backend.cell(3, 0)[1] == curses.A_UNDERLINE
+
+
+def test_color_pairs_reuse_least_recently_used():
+    backend = MemoryBackend(10, 1, color_pairs=4)
+    app = CursedApp(backend=backend)
+
+    class Line(CursedWindow):
+        WIDTH, HEIGHT = 10, 1
+
+        @classmethod
+        def init(cls):
+            for spec in ('red', 'green', 'blue'):
+                cls.addstr('x', 0, 0, attr=spec)
+            for i in range(10):
+                cls.addstr('x', 0, 0, attr='red')
+            cls.addstr('y', 1, 0, attr='yellow')
+            cls.addstr('x', 0, 0, attr='red')
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    # Pair 0 is the terminal's own, so only three can be allocated, and
+    # green was used least recently
+    assert backend.pairs == {
+        1: (curses.COLOR_RED, -1),
+        2: (curses.COLOR_YELLOW, -1),
+        3: (curses.COLOR_BLUE, -1),
+    }
+    assert backend.pair_content(backend.cell(0, 0)[1]) == (
+        curses.COLOR_RED, -1)
+    assert backend.pair_content(backend.cell(1, 0)[1]) == (
+        curses.COLOR_YELLOW, -1)
+
+
+def test_mouse_goes_to_window_under_pointer():
+    backend = MemoryBackend(40, 12)
+    app = CursedApp(backend=backend, mouse=True)
+
+    class Left(CursedWindow):
+        WIDTH, HEIGHT = 20, 12
+        BORDERED = True
+        events = []
+
+        @classmethod
+        def init(cls):
+            cls.focus()
+
+        @classmethod
+        def update(cls):
+            cls.events.extend(iter(cls.getmouse, None))
+            cls.sleep(0.01)
+
+    class Right(CursedWindow):
+        X, WIDTH, HEIGHT = 20, 20, 6
+        PAD = True
+        PAD_WIDTH, PAD_HEIGHT = 100, 100
+        UPDATE_ON_EVENT = True
+        events = []
+
+        @classmethod
+        def update(cls):
+            cls.events.extend(iter(cls.getmouse, None))
+
+    def script():
+        gevent.sleep(0.05)
+        backend.push_mouse(3, 2, curses.BUTTON1_CLICKED)
+        for i in range(10):
+            backend.push_mouse(25, 4, curses.BUTTON5_PRESSED)
+        for i in range(5):
+            backend.push_mouse(21 + i, 1, curses.REPORT_MOUSE_POSITION)
+        backend.push_mouse(22, 2, curses.BUTTON1_CLICKED)
+        backend.push_mouse(10, 8, curses.BUTTON3_CLICKED)
+        gevent.sleep(0.1)
+        quit_all(Left, Right)
+
+    run(app, script)
+    right = [(e.x, e.y, e.clicked(), e.wheel(), e.motion(), e.count)
+             for e in Right.events]
+    # The border shifts Left's coordinates, and the wheel and motion bursts
+    # are merged
+    assert [(e.x, e.y, e.clicked(3)) for e in Left.events] == [
+        (2, 1, False), (9, 7, True)]
+    assert right == [
+        (5, 4, False, 1, False, 10),
+        (5, 1, False, 0, True, 5),
+        (2, 2, True, 0, False, 1),
+    ]
+    # Clicking moves the focus, since the app uses it
+    assert app.focused is Left
+
+
+def test_mouse_opens_menu_of_window_waiting_for_key():
+    backend = MemoryBackend(40, 8)
+    app = CursedApp(backend=backend, mouse=True)
+    seen = {}
+
+    class Main(CursedWindow):
+        WIDTH, HEIGHT = 40, 8
+        BORDERED = True
+        MENU = CursedMenu()
+        MENU.add_menu('File', key='f', items=[('Save', 's', 'save')])
+        MENU.add_menu('编辑', key='e', items=[('Copy', 'c', 'copy')])
+        saved = 0
+
+        @classmethod
+        def save(cls):
+            cls.saved += 1
+
+        @classmethod
+        def copy(cls):
+            pass
+
+        @classmethod
+        def update(cls):
+            cls.getch(timeout=None)
+
+    def script():
+        gevent.sleep(0.05)
+        # The wide title takes four cells, plus one on each side
+        backend.push_mouse(12, 1, curses.BUTTON1_CLICKED)
+        gevent.sleep(0.05)
+        seen['opened'] = Main._OPENED_MENU.title
+        backend.push_mouse(2, 1, curses.BUTTON1_CLICKED)
+        gevent.sleep(0.05)
+        seen['screen'] = backend.screen_text()
+        backend.push_mouse(2, 2, curses.BUTTON1_CLICKED)
+        gevent.sleep(0.05)
+        Main.trigger('quit')
+
+    run(app, script)
+    assert seen['opened'] == '编辑'
+    assert 'Save' in seen['screen'][2]
+    assert Main.saved == 1
+    assert not Main.MOUSE_EVENTS
+
+
+def test_trigger_background():
+    app = CursedApp(backend=MemoryBackend(10, 4))
+
+    class Ticker(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        UPDATE_INTERVAL = 0.01
+        ticks = 0
+
+        @classmethod
+        def update(cls):
+            cls.ticks += 1
+
+    class Worker(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 10, 2
+        got = []
+
+        @classmethod
+        def init(cls):
+            cls.trigger_background('slow', 0.2, callback='done')
+            cls.trigger_background('slow', -1, callback='done',
+                                   errback='failed')
+            cls.got.append(('waited', cls.slow_wait(0.1)))
+            with pytest.raises(CursedCallbackError):
+                cls.trigger_background('slow', 0, callback='dnoe')
+            with pytest.raises(CursedCallbackError):
+                cls.trigger_background('slow', 0, errback='fialed')
+
+        @classmethod
+        def slow(cls, seconds):
+            if seconds < 0:
+                raise ValueError(seconds)
+            # Blocks the thread, not the hub
+            time.sleep(seconds)
+            return seconds
+
+        @classmethod
+        @background
+        def slow_wait(cls, seconds):
+            time.sleep(seconds)
+            return seconds
+
+        @classmethod
+        def done(cls, result):
+            cls.got.append(('done', result))
+            quit_all(Ticker, cls)
+
+        @classmethod
+        def failed(cls, exc):
+            cls.got.append(('failed', repr(exc)))
+
+    run(app)
+    # Callbacks only run once init has returned
+    assert Worker.got == [
+        ('waited', 0.1),
+        ('failed', 'ValueError(-1)'),
+        ('done', 0.2),
+    ]
+    # The other window kept updating while the threads slept
+    assert Ticker.ticks > 5
+
+
+def test_trigger_background_error_fails_app():
+    app = CursedApp(backend=MemoryBackend(10, 2))
+
+    class Worker(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+
+        @classmethod
+        def init(cls):
+            cls.trigger_background('boom')
+
+        @classmethod
+        def boom(cls):
+            raise KeyError('boom')
+
+    with gevent.Timeout(3):
+        result = app.run()
+    assert isinstance(result.err(), KeyError)
+
+
+def test_virtual_pad_wide_characters():
+    backend = MemoryBackend(8, 1)
+    app = CursedApp(backend=backend)
+    seen = []
+
+    class Map(CursedWindow):
+        WIDTH, HEIGHT = 8, 1
+        VIRTUAL_PAD = True
+        PAD_WIDTH, PAD_HEIGHT = 100, 10
+        # Odd, so wide characters straddle tiles
+        TILE_WIDTH = 3
+
+        @classmethod
+        def init(cls):
+            cls.write_markup('你好[bold]世界[/]ab', 0, 0)
+            for x in (0, 1, 2, 5):
+                cls.pad_move(x, 0)
+                cls.refresh()
+                cls.APP._render_frame()
+                seen.append(backend.screen_text()[0])
+            cls.trigger('quit')
+
+    run(app)
+    # Wide characters cut in half by the edges of the view become spaces
+    assert seen == ['你好世界', ' 好世界a', '好世界ab', ' 界ab   ']
+    assert backend.cell(1, 0) == ('界', curses.A_BOLD)
+
+
+def test_addnstr_and_insnstr_lengths():
+    backend = MemoryBackend(10, 4)
+    app = CursedApp(backend=backend)
+
+    class Lines(CursedWindow):
+        WIDTH, HEIGHT = 10, 4
+
+        @classmethod
+        def init(cls):
+            cls.addnstr('abcdef', 0, 0, n=3)
+            cls.addnstr('abcdef', 0, 1, n=-1)
+            cls.addnstr('你好', 0, 2, n=3)
+            cls.addstr('xy', 0, 3)
+            cls.insnstr('abc', 0, 3, n=-1)
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    assert backend.screen_text() == [
+        'abc       ',
+        'abcdef    ',
+        '你        ',
+        'abcxy     ',
+    ]
+
+
+def test_callback_table():
+    app = CursedApp(backend=MemoryBackend(10, 4))
+    results = {}
+
+    class Target(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+
+        @classmethod
+        def double(cls, n):
+            return n * 2
+
+    class Caller(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 10, 2
+
+        @classmethod
+        def init(cls):
+            with pytest.raises(CursedCallbackError):
+                Target.trigger('triple', 1)
+            Target.triple = classmethod(lambda c, n: n * 3)
+            results['added'] = Target.trigger('triple', 2).get(timeout=1)
+            Target.double = classmethod(lambda c, n: n * 4)
+            Target.invalidate_callbacks()
+            results['replaced'] = Target.trigger('double', 2).get(timeout=1)
+            del Target.triple
+            with pytest.raises(CursedCallbackError):
+                Target.trigger('triple', 1)
+            quit_all(Target, cls)
+
+    # Built once with the class, not on every trigger
+    assert 'double' in Target._CW_CALLBACKS[1]
+    run(app)
+    assert results == {'added': 6, 'replaced': 8}
+
+
+class CountingBackend(MemoryBackend):
+    '''
+    A MemoryBackend counting how often the input loop waits for input.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(CountingBackend, self).__init__(*args, **kwargs)
+        self.waits = 0
+
+    def wait_input(self, timeout=None):
+        self.waits += 1
+        return super(CountingBackend, self).wait_input(timeout)
+
+
+def test_input_loop_sleeps_until_input():
+    backend = CountingBackend(10, 2)
+    app = CursedApp(backend=backend, input_timeout=0.5)
+    latency = []
+
+    class Reader(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+
+        @classmethod
+        def update(cls):
+            key = cls.getch(timeout=None)
+            if key is not None:
+                latency.append(time.time() - cls.pushed)
+                cls.trigger('quit')
+
+    def script():
+        gevent.sleep(0.3)
+        Reader.pushed = time.time()
+        backend.push_keys('q')
+
+    run(app, script)
+    # Idle, the loop waited once instead of polling, and the key still
+    # arrived right away
+    assert backend.waits <= 3
+    assert latency[0] < 0.1
+
+
+def test_update_interval_and_on_event():
+    backend = MemoryBackend(10, 6)
+    app = CursedApp(backend=backend)
+
+    class Clock(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+        UPDATE_INTERVAL = 0.1
+        updates = 0
+
+        @classmethod
+        def update(cls):
+            cls.updates += 1
+
+    class Reactive(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 10, 2
+        UPDATE_ON_EVENT = True
+        updates = 0
+
+        @classmethod
+        def poke(cls):
+            pass
+
+        @classmethod
+        def update(cls):
+            cls.updates += 1
+
+    class Busy(CursedWindow):
+        Y, WIDTH, HEIGHT = 4, 10, 2
+        updates = 0
+
+        @classmethod
+        def update(cls):
+            cls.updates += 1
+
+    def script():
+        gevent.sleep(0.15)
+        Reactive.trigger('poke')
+        gevent.sleep(0.2)
+        quit_all(Clock, Reactive, Busy)
+
+    run(app, script)
+    # Once right away, then every 0.1 seconds
+    assert 3 <= Clock.updates <= 5
+    # Once right away, then once for the callback
+    assert Reactive.updates == 2
+    # Without either, update runs on every pass
+    assert Busy.updates > 100
+    assert app.stats['updates'] == (
+        Clock.updates + Reactive.updates + Busy.updates)
+
+
+def test_one_screen_update_per_frame():
+    backend = MemoryBackend(40, 2)
+    app = CursedApp(backend=backend, max_fps=20)
+    windows = []
+    for i in range(4):
+        class Cell(CursedWindow):
+            X, WIDTH, HEIGHT = i * 10, 10, 2
+            n = 0
+
+            @classmethod
+            def update(cls):
+                cls.n += 1
+                cls.write(str(cls.n), 0, 0)
+                cls.refresh()
+
+        windows.append(Cell)
+
+    def script():
+        gevent.sleep(0.5)
+        quit_all(*windows)
+
+    run(app, script)
+    # Every window refreshes constantly, but frames are capped at max_fps
+    # and each is a single screen update for all four windows
+    assert backend.updates == app.stats['frames']
+    assert 5 <= app.stats['frames'] <= 13
+    frames = app.stats['frames']
+    assert 4 * (frames - 1) < app.stats['refreshes'] <= 4 * frames
+    assert all(cw.n > app.stats['frames'] for cw in windows)
+
+
+def test_unchanged_windows_skip_refresh():
+    backend = MemoryBackend(20, 6)
+    app = CursedApp(backend=backend)
+    counts = {}
+
+    class Static(CursedWindow):
+        WIDTH, HEIGHT = 20, 2
+
+        @classmethod
+        def init(cls):
+            # Let Map draw first
+            cls.sleep(0.05)
+            cls.write('static', 0, 0)
+            cls.refresh()
+            cls.APP._render_frame()
+            stats = cls.APP.stats
+            before = stats['refreshes']
+            for i in range(10):
+                cls.refresh()
+            counts['skipped'] = stats['skipped_refreshes']
+            cls.write('changed', 0, 0)
+            cls.refresh()
+            Map.PAD_X = 5
+            Map.refresh()
+            cls.APP._render_frame()
+            counts['refreshed'] = stats['refreshes'] - before
+            quit_all(cls, Map)
+
+    class Map(CursedWindow):
+        Y, WIDTH, HEIGHT = 2, 20, 4
+        PAD = True
+        PAD_WIDTH, PAD_HEIGHT = 100, 10
+
+        @classmethod
+        def init(cls):
+            cls.addstr('0123456789', 0, 0)
+            cls.refresh()
+
+    run(app)
+    assert counts == {'skipped': 10, 'refreshed': 2}
+    assert backend.screen_text()[0] == 'changed'.ljust(20)
+    # Scrolling the pad redrew it without drawing anything new
+    assert backend.screen_text()[2] == '56789'.ljust(20)
+
+
+def test_bench_smoke():
+    results = bench.run_benchmarks(duration=0.1)
+    assert [stats['workload'] for stats in results] == list(bench.WORKLOADS)
+    by_name = dict((stats['workload'], stats) for stats in results)
+    for name in ('windows', 'scroll', 'pad', 'menu', 'latency'):
+        assert by_name[name]['frames/s'] > 0
+        assert by_name[name]['updates/s'] > 0
+    assert by_name['windows']['refreshes/s'] > by_name['windows']['frames/s']
+    assert 0 <= by_name['latency']['p50 ms'] <= by_name['latency']['p99 ms']
+    table = bench._format(results).splitlines()
+    assert [line.split()[0] for line in table] == (
+        ['workload'] + list(bench.WORKLOADS))
+
+
+def test_getkeys_coalesces_navigation_keys():
+    backend = MemoryBackend(10, 2)
+    app = CursedApp(backend=backend)
+    got = []
+    down, up = curses.KEY_DOWN, curses.KEY_UP
+
+    class Reader(CursedWindow):
+        WIDTH, HEIGHT = 10, 2
+
+        @classmethod
+        def init(cls):
+            backend.push_keys([down] * 5 + ['aa', up, down, down])
+            got.append(cls.getkeys(coalesce=True, timeout=1))
+            backend.push_keys([up, up, 'b'])
+            got.append(cls.getkeys(timeout=1))
+            got.append(cls.getkeys())
+            cls.trigger('quit')
+
+    run(app)
+    # Letters are never merged, and neither are different keys
+    assert got == [
+        [(down, 5), (97, 1), (97, 1), (up, 1), (down, 2)],
+        [up, up, 98],
+        [],
+    ]
+
+
+def test_layout_solver():
+    class Win(object):
+        pass
+
+    split = CursedHSplit(CursedPane(Win, size=10),
+                         CursedPane(Win, min_size=5, max_size=8),
+                         CursedPane(Win))
+    assert split._solve(30) == [10, 8, 12]
+    # The last children are cut off when there isn't enough room
+    assert split._solve(12) == [10, 2, 0]
+    assert split._solve(5) == [5, 0, 0]
+    split = CursedVSplit(CursedPane(Win, size='25%', min_size=3),
+                         CursedPane(Win, size=0.5), Win, Win)
+    assert split._solve(10) == [3, 5, 1, 1]
+    assert split._solve(40) == [10, 20, 5, 5]
+    with pytest.raises(CursedWindowError):
+        CursedPane(Win, size='wide')
+
+
+def test_layout_caches_geometry():
+    backend = MemoryBackend(40, 8)
+    app = CursedApp(backend=backend)
+    laid_out = []
+
+    class CountingPane(CursedPane):
+        def _layout(self, x, y, width, height):
+            laid_out.append(self.window.__name__)
+            super(CountingPane, self)._layout(x, y, width, height)
+
+    def window(name):
+        class Win(CursedWindow):
+            WIDTH, HEIGHT = 'layout', 'layout'
+
+            @classmethod
+            def update(cls):
+                cls.write(name, 0, 0)
+                cls.refresh()
+        Win.__name__ = name
+        return Win
+
+    Side, Main, Status = window('side'), window('main'), window('status')
+    side = CountingPane(Side, size='25%', min_size=12)
+    status = CountingPane(Status, size=1)
+    app.set_layout(CursedHSplit(side, CursedVSplit(CountingPane(Main),
+                                                   status)))
+    geometry = []
+
+    def script():
+        gevent.sleep(0.1)
+        geometry.append([(cw.X, cw.Y, cw.WIDTH, cw.HEIGHT)
+                         for cw in (Side, Main, Status)])
+        del laid_out[:]
+        # Only the status line and the pane sharing its split are solved
+        status.set(size=2)
+        app.relayout()
+        geometry.append(sorted(laid_out))
+        del laid_out[:]
+        # Nothing changed, so nothing is solved again
+        app.relayout()
+        geometry.append(laid_out[:])
+        backend.resize(80, 8)
+        gevent.sleep(0.1)
+        geometry.append([(cw.X, cw.Y, cw.WIDTH, cw.HEIGHT)
+                         for cw in (Side, Main, Status)])
+        quit_all(Side, Main, Status)
+
+    run(app, script)
+    assert geometry == [
+        [(0, 0, 12, 8), (12, 0, 28, 7), (12, 7, 28, 1)],
+        ['main', 'status'],
+        [],
+        [(0, 0, 20, 8), (20, 0, 60, 6), (20, 6, 60, 2)],
+    ]
+    screen = backend.screen_text()
+    assert screen[0] == 'side'.ljust(20) + 'main'.ljust(60)
+    assert screen[6] == ' ' * 20 + 'status'.ljust(60)
+
+
+def test_viewer_index_and_goto(tmp_path):
+    path = tmp_path / 'big.txt'
+    lines = ['line {}\tend'.format(i) for i in range(3000)]
+    # Windows line endings are stripped, and the last line has no newline
+    path.write_bytes('\r\n'.join(lines).encode('utf-8'))
+    backend = MemoryBackend(20, 4)
+    app = CursedApp(backend=backend)
+    seen = {}
+
+    class Viewer(CursedViewer):
+        WIDTH, HEIGHT = 20, 4
+        PATH = str(path)
+        INDEX_CHUNK = 512
+
+    def script():
+        # Not opened yet counts as indexed, as there is nothing to index
+        while Viewer._CV_FILE is None or not Viewer.indexed():
+            gevent.sleep(0.01)
+        seen['count'] = Viewer.line_count()
+        seen['checkpoints'] = len(Viewer._CV_LINES)
+        seen['lines'] = [Viewer.get_lines(start, 2)
+                         for start in (2999, 1500, 7, 2998)]
+        seen['past end'] = Viewer.get_lines(3000, 5)
+        backend.push_keys([curses.KEY_NPAGE] * 2 + [curses.KEY_DOWN] * 3 +
+                          [curses.KEY_RIGHT] * 5)
+        gevent.sleep(0.1)
+        seen['paged'] = backend.screen_text()
+        backend.push_key(curses.KEY_END)
+        gevent.sleep(0.1)
+        seen['end'] = Viewer.TOP
+        Viewer.goto(-10)
+        seen['start'] = Viewer.TOP
+        Viewer.goto(1234)
+        Viewer.trigger('render')
+        gevent.sleep(0.1)
+        seen['goto'] = backend.screen_text()[0]
+        Viewer.trigger('quit')
+
+    run(app, script)
+    assert seen['count'] == 3000
+    # One checkpoint per chunk, not one per line
+    assert 50 < seen['checkpoints'] < 200
+    assert seen['lines'] == [
+        ['line 2999       end'],
+        ['line 1500       end', 'line 1501       end'],
+        ['line 7  end', 'line 8  end'],
+        ['line 2998       end', 'line 2999       end'],
+    ]
+    assert seen['past end'] == []
+    assert seen['paged'] == [
+        '11 end'.ljust(20),
+        '12 end'.ljust(20),
+        '13 end'.ljust(20),
+        '14 end'.ljust(20),
+    ]
+    assert seen['end'] == 2996
+    assert seen['start'] == 0
+    assert seen['goto'] == '1234       end'.ljust(20)
+    # The file is closed once the window quits
+    assert Viewer._CV_MMAP is None and Viewer._CV_FILE is None
+
+
+def test_virtual_pad_builds_visible_tiles():
+    backend = MemoryBackend(40, 6)
+    app = CursedApp(backend=backend)
+    built = []
+    seen = []
+
+    class Map(CursedWindow):
+        WIDTH, HEIGHT = 40, 6
+        VIRTUAL_PAD = True
+        PAD_WIDTH = PAD_HEIGHT = 100000
+        TILE_WIDTH, TILE_HEIGHT = 16, 4
+        TILE_CACHE_SIZE = 8
+
+        @classmethod
+        def tile(cls, tx, ty):
+            built.append((tx, ty))
+            return ['{},{}:{}'.format(tx, ty, y).ljust(16, '.')
+                    for y in range(4)]
+
+        @classmethod
+        def show(cls, x, y):
+            cls.pad_move(x, y)
+            cls.refresh()
+            cls.APP._render_frame()
+            seen.append((sorted(built), list(cls._CW_TILES)))
+            del built[:]
+
+        @classmethod
+        def init(cls):
+            cls.show(0, 0)
+            screen = backend.screen_text()
+            seen.append([screen[0], screen[5]])
+            cls.show(5, 2)
+            cls.show(20, 0)
+            cls.show(0, 0)
+            cls.pad_write('HELLO', 18, 1, attr='bold')
+            cls.invalidate_tiles(2, 0)
+            cls.show(0, 0)
+            seen.append(backend.screen_text()[1])
+            seen.append(backend.cell(18, 1))
+            cls.show(99990, 99998)
+            seen.append(backend.screen_text()[:2])
+            cls.trigger('quit')
+
+    run(app)
+    first = [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1)]
+    assert seen[0] == (sorted(first), first)
+    assert seen[1] == ['0,0:0...........1,0:0...........2,0:0...',
+                       '0,1:1...........1,1:1...........2,1:1...']
+    # Moving within the tiles in view builds nothing
+    assert seen[2] == ([], first)
+    assert seen[3] == ([(3, 0), (3, 1)],
+                       [(0, 0), (0, 1), (1, 0), (2, 0), (3, 0), (1, 1),
+                        (2, 1), (3, 1)])
+    assert seen[4] == ([], [(3, 0), (3, 1)] + first)
+    # Only the tile written to and the invalidated one are built again
+    assert seen[5][0] == [(1, 0), (2, 0)]
+    assert seen[6] == '0,0:1...........1,HELLO.........2,0:1...'
+    assert seen[7] == ('H', curses.A_BOLD)
+    # The least recently shown tile makes room for the new one
+    assert seen[8] == ([(6249, 24999)],
+                       [(3, 1)] + first + [(6249, 24999)])
+    # The view is cut off at the edge of the pad
+    assert seen[9] == ['4999:2....'.ljust(40), '4999:3....'.ljust(40)]
+
+
+def test_blit_clips_and_groups_attribute_runs():
+    backend = MemoryBackend(20, 6)
+    app = CursedApp(backend=backend)
+    calls = []
+    bold, under = curses.A_BOLD, curses.A_UNDERLINE
+
+    class Box(CursedWindow):
+        WIDTH, HEIGHT = 12, 6
+        BORDERED = True
+
+        @classmethod
+        def init(cls):
+            addstr = cls.WINDOW.addstr
+
+            def counting_addstr(y, x, text, attr):
+                calls.append(text)
+                addstr(y, x, text, attr)
+
+            cls.WINDOW.addstr = counting_addstr
+            # Clipped on every side by the border
+            cls.blit(['abcdefghijklmnop', 'ABCDEFGHIJKLMNOP', '', '01234567',
+                      'hidden'], x=-2, y=0, attrs='bold')
+            cls.blit(b'1234512345', x=3, y=2, stride=5,
+                     attrs=[[0, bold, bold, under, under], [under] * 5])
+            with pytest.raises(ValueError):
+                cls.blit(b'12345', 0, 0)
+            cls.refresh()
+            cls.trigger('quit')
+
+    class Side(CursedWindow):
+        X, Y, WIDTH, HEIGHT = 12, 0, 8, 6
+
+        @classmethod
+        def init(cls):
+            cls.blit(['#' * 10] * 9, x=1, y=-1)
+            cls.refresh()
+            cls.trigger('quit')
+
+    run(app)
+    assert backend.screen_text() == [
+        '+----------+ #######',
+        '|cdefghijkl| #######',
+        '|CDEFGHIJKL| #######',
+        '|   12345  | #######',
+        '|23412345  | #######',
+        '+----------+ #######',
+    ]
+    # One call per run of equal attributes
+    assert calls == ['cdefghijkl', 'CDEFGHIJKL', '234567', '1', '23', '45',
+                     '12345']
+    assert [backend.cell(x, 3)[1] for x in range(4, 9)] == [
+        0, bold, bold, under, under]
+    assert [backend.cell(x, 4)[1] for x in range(1, 9)] == (
+        [bold] * 3 + [under] * 5)
+
+
+def test_scrollback_history():
+    backend = MemoryBackend(8, 3)
+    app = CursedApp(backend=backend)
+    seen = []
+
+    class Log(CursedWindow):
+        WIDTH, HEIGHT = 8, 3
+        SCROLL = True
+        SCROLLBACK = 5
+
+        @classmethod
+        def log(cls, *lines):
+            for line in lines:
+                cls.addstr(line)
+                cls.nextline()
+
+        @classmethod
+        def show(cls):
+            cls.refresh()
+            cls.APP._render_frame()
+            seen.append(backend.screen_text())
+
+        @classmethod
+        def init(cls):
+            cls.log(*['line {}'.format(i) for i in range(10)])
+            cls.show()
+            cls.history_up(1)
+            cls.show()
+            cls.history_up()
+            cls.show()
+            # Only the last SCROLLBACK lines are kept
+            cls.history_up(100)
+            cls.show()
+            cls.history_down(1)
+            # New lines don't move the history being read
+            cls.log('line 10')
+            cls.show()
+            cls.history_down(2)
+            seen.append(cls.in_history())
+            cls.show()
+            cls.history_end()
+            seen.append(cls.in_history())
+            cls.show()
+            cls.trigger('quit')
+
+    run(app)
+    assert seen == [
+        ['line 8  ', 'line 9  ', '        '],
+        ['line 7  ', 'line 8  ', 'line 9  '],
+        ['line 4  ', 'line 5  ', 'line 6  '],
+        ['line 3  ', 'line 4  ', 'line 5  '],
+        ['line 4  ', 'line 5  ', 'line 6  '],
+        True,
+        ['line 6  ', 'line 7  ', 'line 8  '],
+        False,
+        ['line 9  ', 'line 10 ', '        '],
+    ]
+
+
+def test_tail_follows_rotation_and_truncation(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_bytes(''.join('old {}\n'.format(i)
+                             for i in range(1000)).encode('utf-8'))
+    backend = MemoryBackend(16, 3)
+    app = CursedApp(backend=backend)
+    renders = []
+    seen = {}
+
+    class Tail(CursedTail):
+        WIDTH, HEIGHT = 16, 3
+        PATH = str(path)
+        POLL_INTERVAL = 0.01
+        READ_SIZE = 256
+        LINES = 50
+        RENDER_INTERVAL = 0.05
+
+        @classmethod
+        def render(cls):
+            renders.append(cls.lines()[-1])
+            super(Tail, cls).render()
+
+    def wait_for(last):
+        while not Tail.lines() or Tail.lines()[-1] != last:
+            gevent.sleep(0.01)
+        gevent.sleep(0.1)
+
+    def script():
+        wait_for('old 999')
+        seen['start'] = Tail.lines()
+        del renders[:]
+        log = open(str(path), 'ab')
+        log.write(''.join('burst {}\n'.format(i)
+                          for i in range(2000)).encode('utf-8'))
+        log.write(b'partial')
+        log.flush()
+        wait_for('burst 1999')
+        seen['renders'] = len(renders)
+        seen['burst'] = backend.screen_text()
+        backend.push_key(curses.KEY_PPAGE)
+        gevent.sleep(0.05)
+        log.write(b' line\nmore\n')
+        log.flush()
+        wait_for('more')
+        seen['back'] = (Tail.following(), backend.screen_text())
+        backend.push_key(curses.KEY_END)
+        gevent.sleep(0.05)
+        seen['end'] = (Tail.following(), backend.screen_text())
+        # Rotated: the rest of the old file is read before the new one
+        os.rename(str(path), str(path) + '.1')
+        path.write_bytes(b'rotated 1\nrotated 2\n')
+        log.write(b'late old\n')
+        log.close()
+        wait_for('rotated 2')
+        seen['rotated'] = backend.screen_text()
+        path.write_bytes(b'truncated\n')
+        wait_for('truncated')
+        seen['truncated'] = Tail.lines()[-4:]
+        Tail.trigger('quit')
+
+    run(app, script)
+    # Only about READ_SIZE bytes from the end are read at first
+    assert 10 < len(seen['start']) < 50
+    assert seen['start'][-1] == 'old 999'
+    # The burst is read in many chunks but drawn only a few times
+    assert 1 <= seen['renders'] <= 4
+    assert seen['burst'] == ['burst 1997'.ljust(16), 'burst 1998'.ljust(16),
+                             'burst 1999'.ljust(16)]
+    assert seen['back'] == (False, ['burst 1994'.ljust(16),
+                                    'burst 1995'.ljust(16),
+                                    'burst 1996'.ljust(16)])
+    assert seen['end'] == (True, ['burst 1999'.ljust(16),
+                                  'partial line'.ljust(16),
+                                  'more'.ljust(16)])
+    assert seen['rotated'] == ['late old'.ljust(16), 'rotated 1'.ljust(16),
+                               'rotated 2'.ljust(16)]
+    assert seen['truncated'] == ['late old', 'rotated 1', 'rotated 2',
+                                 'truncated']